@@ -10,24 +10,35 @@
 """
 
 import os
+import re
+import sys
+import html
 import json
+import time
+import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from bisect import bisect_right
+from functools import lru_cache, wraps
+from types import MappingProxyType
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
+from zoneinfo import ZoneInfo
 
-import pytz
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, 
+    AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, 
     MessageHandler, filters, ContextTypes, ConversationHandler
 )
-from telegram.helpers import escape_markdown
 
-from database import Database
+from database import Database, sql_date_short
 
-# Загружаем переменные окружения
-from dotenv import load_dotenv
-load_dotenv()
+# orjson разбирает message_data в несколько раз быстрее json, но необязателен.
+# Его JSONDecodeError наследует json.JSONDecodeError, так что обработка ошибок та же
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 # Настройка логирования
 logging.basicConfig(
@@ -53,314 +64,802 @@ EDITING_TASK_OPEN_DATE = 16
 
 REVIEWING_SUBMISSION = 20
 
+# Часовой пояс, в котором админы вводят и видят даты
+MOSCOW_TZ = ZoneInfo('Europe/Moscow')
+
+# Начиная с Python 3.11 fromisoformat сам понимает суффикс 'Z'
+if sys.version_info >= (3, 11):
+    _parse_iso = datetime.fromisoformat
+else:
+    def _parse_iso(value: str) -> datetime:
+        # Строки из SQLite ('ГГГГ-ММ-ДД ЧЧ:ММ:СС') идут без копирования
+        if value[-1:] == 'Z':
+            value = value[:-1] + '+00:00'
+        return datetime.fromisoformat(value)
+
+
+def _fmt_short(d: datetime) -> str:
+    """Дата в списках: ДД.ММ ЧЧ:ММ"""
+    return f"{d.day:02d}.{d.month:02d} {d.hour:02d}:{d.minute:02d}"
+
+
+def _fmt_long(d: datetime) -> str:
+    """Дата в карточках: ДД.ММ.ГГГГ в ЧЧ:ММ МСК"""
+    return f"{d.day:02d}.{d.month:02d}.{d.year} в {d.hour:02d}:{d.minute:02d} МСК"
+
+
+# Ручной ввод даты: ДД.ММ.ГГГГ с необязательным временем ЧЧ:ММ
+_DATE_RE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})(?:\s+(\d{1,2}):(\d{1,2}))?')
+
+# Строка статуса проверки в карточке отчета
+_REPORT_STATUS_RE = re.compile(r'(📊 <b>Статус проверки:</b> )[^\n]*')
+
+# Допустимые ссылки заданий: @канал, http(s):// и t.me/
+_URL_RE = re.compile(r'@.|https?://|t\.me/')
+
+
+def _parse_date_input(text: str, default_hour: int, default_minute: int) -> datetime:
+    """Разбирает дату, введенную админом, в московском времени.
+    
+    Если время не указано, подставляется default_hour:default_minute.
+    Бросает ValueError при неверном формате или несуществующей дате.
+    """
+    match = _DATE_RE.fullmatch(text)
+    if not match:
+        raise ValueError("Неверный формат даты")
+    day, month, year, hour, minute = match.groups()
+    if hour is None:
+        return datetime(int(year), int(month), int(day), default_hour, default_minute, tzinfo=MOSCOW_TZ)
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), tzinfo=MOSCOW_TZ)
+
+# Ключевые слова для даты открытия и дедлайна: слово -> функция от текущего времени
+_OPEN_DATE_KEYWORDS = MappingProxyType({
+    **dict.fromkeys(('сейчас', 'now'), lambda now: now),
+    **dict.fromkeys(('завтра', 'tomorrow'),
+                    lambda now: (now + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)),
+    **dict.fromkeys(('неделя', 'week'),
+                    lambda now: (now + timedelta(weeks=1)).replace(hour=9, minute=0, second=0, microsecond=0)),
+})
+
+_DEADLINE_KEYWORDS = MappingProxyType({
+    **dict.fromkeys(('завтра', 'tomorrow'),
+                    lambda now: now.replace(hour=23, minute=59, second=59) + timedelta(days=1)),
+    **dict.fromkeys(('неделя', 'week'),
+                    lambda now: (now + timedelta(weeks=1)).replace(hour=23, minute=59, second=59)),
+    **dict.fromkeys(('нет', 'no', '-'), lambda now: None),
+})
+
+# Кнопки правки полей из предпросмотра (входят в диалог создания задания)
+_PREVIEW_EDIT_PATTERN = r"^edit_preview_(title|description|link|open_date|deadline)$"
+
+# Ключи user_data, которые принадлежат диалогам создания/редактирования заданий
+_DIALOG_KEYS = ('adding_task', 'editing_task_id', 'editing_state')
+
+# Время жизни кэша счетчиков в меню отчетов и статистики (секунды)
+MENU_CACHE_TTL = 3.0
+# Время жизни снимка списка заданий: правки админа сбрасывают его сразу,
+# а изменения из пользовательского бота видны не позже чем через TTL
+TASKS_LIST_CACHE_TTL = 30.0
+# Брошенный на полпути диалог создания задания завершается через 15 минут
+ADD_TASK_CONVERSATION_TIMEOUT = 15 * 60
+
+# Подписи типов и статусов отчетов (только для чтения)
+_TYPE_EMOJI = MappingProxyType({"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"})
+_TYPE_TEXT = MappingProxyType({"text": "📝 Текст", "photo": "📸 Фото", "video": "🎥 Видео", "document": "📄 Документ"})
+_STATUS_EMOJI = MappingProxyType({"pending": "⏳", "approved": "✅", "rejected": "❌"})
+_STATUS_TEXT = MappingProxyType({"pending": "⏳ Ожидает проверки", "approved": "✅ Одобрен", "rejected": "❌ Отклонен"})
+_PARTICIPATION_TEXT = MappingProxyType({"individual": "👤 Индивидуальное", "family": "👨‍👩‍👧‍👦 Семейное"})
+
+# Сколько отчетов на проверку показывать на одной странице
+PENDING_PAGE_SIZE = 10
+ALL_REPORTS_PAGE_SIZE = 15
+USER_REPORTS_PAGE_SIZE = 10
+TASKS_PAGE_SIZE = 20
+# Потенциальные отчеты: первая страница и полный список по кнопке "и еще N"
+# (в клавиатуре Telegram не больше 100 кнопок)
+POTENTIAL_PAGE_SIZE = 10
+POTENTIAL_ALL_LIMIT = 90
+# Отображаемое имя автора отчета (как в _format_user без username), считается в SQL
+_SQL_USER_NAME = (
+    "COALESCE(NULLIF(TRIM(COALESCE(u.first_name, '') || ' ' || COALESCE(u.last_name, '')), ''),"
+    " 'ID' || s.user_id) AS user_name"
+)
+# Запросы обработчиков редактирования дат и потенциальных отчетов. Один и тот же
+# текст SQL попадает в кэш подготовленных выражений постоянного соединения
+_SQL_TASK_OPEN_DATE = 'SELECT open_date FROM tasks WHERE id = ?'
+_SQL_TASK_DEADLINE = 'SELECT deadline, open_date FROM tasks WHERE id = ?'
+_SQL_UPDATE_TASK_OPEN_DATE = 'UPDATE tasks SET open_date = ?, is_open = ? WHERE id = ?'
+_SQL_UPDATE_TASK_DEADLINE = 'UPDATE tasks SET deadline = ? WHERE id = ?'
+_SQL_POTENTIAL_WITH_AUTHOR = (
+    'SELECT o.user_id, o.message_data, u.user_id AS known_user, u.first_name, u.last_name'
+    ' FROM offline_messages o LEFT JOIN users u ON o.user_id = u.user_id WHERE o.id = ?'
+)
+_SQL_DELETE_POTENTIAL = 'DELETE FROM offline_messages WHERE id = ? RETURNING id'
+# Сколько разобранных message_data потенциальных отчетов держать в памяти
+OFFLINE_PAYLOAD_CACHE_SIZE = 512
+# Имя автора (или название задания) в кнопке отчета: 50 символов минус эмодзи, " • " и дата ДД.ММ ЧЧ:ММ
+REPORT_BUTTON_NAME_LEN = 32
+
+# Сколько свободных страниц БД возвращать системе за одну очистку логов
+CLEANUP_VACUUM_PAGES = 1000
+# Сколько строк за раз вычитывается из курсора при экспорте в CSV
+EXPORT_FETCH_SIZE = 1000
+# Исходящие запросы к Bot API: не больше 30 в секунду на бота и 20 в минуту на
+# группу; при RetryAfter запрос ждет указанное Telegram время и повторяется
+SEND_OVERALL_RATE = 30
+SEND_GROUP_RATE_PER_MINUTE = 20
+SEND_MAX_RETRIES = 3
+# Уровень DEFLATE для полной выгрузки: на CSV отчетов 5 почти вдвое быстрее
+# уровня 6 по умолчанию при архиве больше всего на ~8%
+EXPORT_ZIP_LEVEL = 5
+
+# Выгрузки в CSV: заголовок и запрос
+_USERS_EXPORT = (
+    ('User ID', 'Username', 'Telegram First Name', 'Telegram Last Name',
+     'First Name', 'Last Name', 'Participation Type', 'Family Members',
+     'Children Info', 'Registration Completed', 'Registration Date'),
+    """
+    SELECT user_id, username, telegram_first_name, telegram_last_name,
+           first_name, last_name, participation_type, family_members_count,
+           children_info, registration_completed, registration_date
+    FROM users ORDER BY registration_date DESC
+    """,
+)
+_TASKS_EXPORT = (
+    ('ID', 'Title', 'Description', 'Link', 'Is Open', 'Week Number', 'Deadline', 'Open Date'),
+    """
+    SELECT id, title, description, link, is_open, week_number, deadline, open_date
+    FROM tasks ORDER BY id DESC
+    """,
+)
+_SUBMISSIONS_EXPORT = (
+    ('ID', 'User ID', 'Task ID', 'Submission Date', 'Type',
+     'Content', 'File ID', 'Status', 'On Time', 'Task Title', 'First Name', 'Last Name'),
+    """
+    SELECT s.id, s.user_id, s.task_id, s.submission_date, s.submission_type,
+           s.content, s.file_id, s.status, s.is_on_time, t.title, u.first_name, u.last_name
+    FROM submissions s
+    LEFT JOIN tasks t ON s.task_id = t.id
+    LEFT JOIN users u ON s.user_id = u.user_id
+    ORDER BY s.submission_date DESC
+    """,
+)
+
+# Статические тексты (HTML) и клавиатуры меню (создаются один раз при загрузке модуля)
+_WELCOME_TEXT = (
+    "🔧 <b>Админ-панель Эко-бота</b>\n\n"
+    "Добро пожаловать, {first_name}!\n\n"
+    "Доступные функции:\n"
+    "• 📋 Управление заданиями\n"
+    "• 📤 Просмотр отчетов\n"
+    "• ✅ Модерация отчетов\n"
+    "• 📊 Статистика\n"
+    "• 🔧 Системные функции\n\n"
+    "Выберите действие:"
+)
+
+_MAIN_MENU_TEXT = (
+    "🔧 <b>Админ-панель Эко-бота</b>\n\n"
+    "Выберите раздел для работы:"
+)
+
+_TASKS_MENU_TEXT = (
+    "📋 <b>Управление заданиями</b>\n\n"
+    "Выберите действие:"
+)
+
+_SYSTEM_MENU_TEXT = (
+    "🔧 <b>Системные функции</b>\n\n"
+    "Доступные действия:"
+)
+
+_ADD_TASK_MENU_TEXT = (
+    "➕ <b>Добавление нового задания</b>\n\n"
+    "🚀 <b>Быстрый старт:</b>\n"
+    "• Используйте шаблоны для типовых заданий\n"
+    "• Автоматический расчет дедлайнов\n"
+    "• Предварительный просмотр перед созданием\n\n"
+    "Выберите способ создания задания:"
+)
+
+# Команды, показываемые в меню Telegram
+_BOT_COMMANDS = (
+    BotCommand("start", "Запустить админ-панель"),
+)
+
+# Шаблоны сообщений о черновике задания (заполняются через format_map)
+_SUCCESS_TEMPLATE = (
+    "✅ <b>ЗАДАНИЕ УСПЕШНО СОЗДАНО!</b>\n\n"
+    "🆔 <b>ID задания:</b> {id}\n"
+    "📝 <b>Название:</b> {title}\n"
+    "📄 <b>Описание:</b> {desc_short}\n"
+    "🔗 <b>Ссылка:</b> {link}\n"
+    "📅 <b>Открытие:</b> {open}\n"
+    "⏰ <b>Дедлайн:</b> {deadline}\n"
+    "🟢 <b>Статус:</b> {status}\n\n"
+    "🎉 <b>Задание {avail}!</b>"
+)
+
+_EDIT_PREVIEW_TEMPLATE = (
+    "✏️ <b>РЕДАКТИРОВАНИЕ ЗАДАНИЯ</b>\n\n"
+    "📝 <b>Название:</b> {title}\n"
+    "📄 <b>Описание:</b> {desc_short}\n"
+    "🔗 <b>Ссылка:</b> {link}\n"
+    "📅 <b>Открытие:</b> {open}\n"
+    "⏰ <b>Дедлайн:</b> {deadline}\n\n"
+    "Что хотите изменить?"
+)
+
+# Шаблоны заданий (только для чтения)
+_TEMPLATES = MappingProxyType({
+    'observation': MappingProxyType({
+        'title': 'Экологическое наблюдение',
+        'description': 'Проведите наблюдение за природой в вашем районе. Сфотографируйте интересные природные объекты и поделитесь своими наблюдениями.',
+        'link': None
+    }),
+    'action': MappingProxyType({
+        'title': 'Экологическое действие',
+        'description': 'Совершите одно полезное действие для окружающей среды. Это может быть уборка территории, посадка растений или сортировка отходов.',
+        'link': None
+    }),
+    'research': MappingProxyType({
+        'title': 'Исследование природы',
+        'description': 'Проведите небольшое исследование природного объекта в вашем районе. Изучите его особенности и поделитесь результатами.',
+        'link': None
+    })
+})
+
+# Тексты шагов диалога создания задания
+_STEP1_TEXT = (
+    "➕ <b>Создание задания с нуля</b>\n\n"
+    "📝 <b>Шаг 1/5:</b> Введите название задания\n"
+    "💡 <i>Минимум 5 символов, максимум 100</i>\n\n"
+    "⚡ <b>Быстрые команды:</b>\n"
+    "• <code>/template_observation</code> - Экологическое наблюдение\n"
+    "• <code>/template_action</code> - Экологическое действие\n"
+    "• <code>/template_research</code> - Исследование природы\n\n"
+    "🔧 <i>Для отмены введите</i> <code>/cancel</code>"
+)
+
+_ADD_TASK_START_TEXT = (
+    "➕ <b>Добавление нового задания</b>\n\n"
+    "🚀 <b>Быстрый старт:</b>\n"
+    "• Используйте шаблоны для типовых заданий\n"
+    "• Автоматический расчет дедлайнов\n"
+    "• Предварительный просмотр перед созданием\n\n"
+    "📝 <b>Шаг 1/5:</b> Введите название задания\n"
+    "💡 <i>Минимум 5 символов, максимум 100</i>\n\n"
+    "⚡ <b>Быстрые шаблоны:</b>\n"
+    "• <code>/template_observation</code> - Экологическое наблюдение\n"
+    "• <code>/template_action</code> - Экологическое действие\n"
+    "• <code>/template_research</code> - Исследование природы\n\n"
+    "🔧 <i>Для отмены введите</i> <code>/cancel</code>"
+)
+
+_STEP2_TEXT_TEMPLATE = (
+    "✅ <b>Название принято!</b>\n"
+    "📝 <i>{title}</i>\n\n"
+    "📊 <b>Прогресс:</b> 🟢🔘🔘🔘🔘 (1/5)\n\n"
+    "📄 <b>Шаг 2/5:</b> Введите описание задания\n"
+    "💡 <i>Опишите, что должны сделать участники</i>\n\n"
+    "📋 <b>Примеры хорошего описания:</b>\n"
+    "• Сфотографируйте 3 вида растений в вашем районе\n"
+    "• Проведите уборку территории площадью 100 кв.м\n"
+    "• Измерьте температуру воды в ближайшем водоеме"
+)
+
+_STEP3_TEXT_TEMPLATE = (
+    "✅ <b>Описание принято!</b>\n"
+    "📄 <i>{desc_short}</i>\n\n"
+    "📊 <b>Прогресс:</b> 🟢🟢🔘🔘🔘 (2/5)\n\n"
+    "🔗 <b>Шаг 3/5:</b> Введите ссылку на задание\n"
+    "💡 <i>Необязательно - для дополнительных материалов</i>\n\n"
+    "📋 <b>Варианты ввода:</b>\n"
+    "• Полная ссылка: <code>https://example.com/task</code>\n"
+    "• Без ссылки: <code>нет</code>, <code>no</code>, <code>-</code> или <code>пропустить</code>\n"
+    "• Telegram канал: <code>@channel_name</code>"
+)
+
+_STEP4_TEXT_TEMPLATE = (
+    "✅ <b>Ссылка {status}!</b>\n"
+    "🔗 <i>{link}</i>\n\n"
+    "📊 <b>Прогресс:</b> 🟢🟢🟢🔘🔘 (3/5)\n\n"
+    "📅 <b>Шаг 4/5:</b> Установите дату открытия задания\n"
+    "💡 <i>Когда задание станет доступно пользователям</i>\n\n"
+    "📋 <b>Варианты ввода:</b>\n"
+    "• Сейчас: <code>сейчас</code> или <code>now</code>\n"
+    "• Завтра: <code>завтра</code> или <code>tomorrow</code>\n"
+    "• Конкретная дата: <code>ДД.ММ.ГГГГ</code> или <code>ДД.ММ.ГГГГ ЧЧ:ММ</code>\n"
+    "• Через неделю: <code>неделя</code> или <code>week</code>"
+)
+
+_STEP5_TEXT_TEMPLATE = (
+    "✅ <b>Дата открытия установлена!</b>\n"
+    "📅 <i>{open}</i>\n\n"
+    "📊 <b>Прогресс:</b> 🟢🟢🟢🟢🔘 (4/5)\n\n"
+    "⏰ <b>Шаг 5/5:</b> Установите дедлайн\n"
+    "💡 <i>Предлагаемый дедлайн: {suggested}</i>\n\n"
+    "📋 <b>Варианты ввода:</b>\n"
+    "• Автоматический: <code>авто</code> или <code>auto</code>\n"
+    "• Ручной ввод: <code>ДД.ММ.ГГГГ ЧЧ:ММ</code>\n"
+    "• Завтра в 23:59: <code>завтра</code>\n"
+    "• Через неделю: <code>неделя</code>\n"
+    "• Без дедлайна: <code>нет</code>"
+)
+
+# Кнопки, которые повторяются в разных экранах
+_BTN_MAIN_MENU = InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")
+_BTN_REPORTS_MENU = InlineKeyboardButton("📤 Отчеты", callback_data="reports_menu")
+_BTN_REFRESH_POTENTIAL = InlineKeyboardButton("🔄 Обновить", callback_data="potential_reports")
+
+_PREVIEW_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Создать задание", callback_data="confirm_create_task")],
+    [InlineKeyboardButton("✏️ Изменить", callback_data="edit_task_preview")],
+    [InlineKeyboardButton("❌ Отменить", callback_data="tasks_menu")]
+])
+
+_TEMPLATE_PICK_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎯 Шаблон: Наблюдение", callback_data="template_observation")],
+    [InlineKeyboardButton("🌱 Шаблон: Действие", callback_data="template_action")],
+    [InlineKeyboardButton("🔬 Шаблон: Исследование", callback_data="template_research")],
+    [InlineKeyboardButton("❌ Отмена", callback_data="tasks_menu")]
+])
+
+_MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📋 Задания", callback_data="tasks_menu")],
+    [_BTN_REPORTS_MENU],
+    [InlineKeyboardButton("📊 Статистика", callback_data="stats_menu")],
+    [InlineKeyboardButton("🔧 Система", callback_data="system_menu")]
+])
+
+_TASKS_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Добавить задание", callback_data="add_task")],
+    [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
+    [_BTN_MAIN_MENU]
+])
+
+_STATS_REFRESH_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Обновить", callback_data="stats_menu")],
+    [_BTN_MAIN_MENU]
+])
+
+# Общие хвосты клавиатур списков: строки кнопок создаются один раз
+_TASKS_LIST_TAIL = (
+    (InlineKeyboardButton("➕ Добавить задание", callback_data="add_task"),),
+    (_BTN_MAIN_MENU,),
+)
+_EMPTY_TASKS_LIST_MARKUP = InlineKeyboardMarkup(_TASKS_LIST_TAIL)
+
+_PENDING_TAIL = (
+    (InlineKeyboardButton("🔄 Обновить", callback_data="pending_reports"),),
+    (_BTN_MAIN_MENU,),
+)
+_EMPTY_PENDING_MARKUP = InlineKeyboardMarkup(_PENDING_TAIL)
+
+_TASK_CARD_TAIL = (
+    (InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks"),),
+    (_BTN_MAIN_MENU,),
+)
+
+_SYSTEM_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Экспорт данных", callback_data="export_data")],
+    [InlineKeyboardButton("🧹 Очистка логов", callback_data="clear_logs")],
+    [_BTN_MAIN_MENU]
+])
+
+_ADD_TASK_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎯 Шаблон: Наблюдение", callback_data="template_observation")],
+    [InlineKeyboardButton("🌱 Шаблон: Действие", callback_data="template_action")],
+    [InlineKeyboardButton("🔬 Шаблон: Исследование", callback_data="template_research")],
+    [InlineKeyboardButton("✏️ Создать с нуля", callback_data="create_manual")],
+    [InlineKeyboardButton("❌ Отмена", callback_data="tasks_menu")]
+])
+
+@lru_cache(maxsize=1)
+def _parse_admin_env() -> Tuple[bool, FrozenSet[int]]:
+    """Разбирает ADMIN_IDS один раз за процесс.
+    
+    Возвращает пару (режим открытого доступа, множество ID).
+    """
+    admin_env = os.getenv('ADMIN_IDS') or os.getenv('ADMIN_ID') or ''
+    if not admin_env:
+        logger.warning("ADMIN_IDS не найден в переменных окружения!")
+        return False, frozenset()
+    
+    # Проверяем специальное значение "all"
+    if admin_env.strip().lower() == 'all':
+        logger.warning("⚠️ РЕЖИМ ОТКРЫТОГО ДОСТУПА: Админ-бот доступен всем пользователям!")
+        return True, frozenset()
+    
+    admin_ids = set()
+    for admin_id in map(str.strip, admin_env.split(',')):
+        if not admin_id:
+            continue
+        try:
+            admin_ids.add(int(admin_id))
+        except ValueError:
+            logger.warning(f"Некорректный ADMIN_ID: {admin_id}")
+    
+    logger.info(f"Загружены ID администраторов: {sorted(admin_ids)}")
+    return False, frozenset(admin_ids)
+
+
+def _format_user(first_name: Optional[str], last_name: Optional[str], user_id: int,
+                 username: Optional[str] = None) -> str:
+    """Имя пользователя для админки: "Имя Фамилия (@username)" или "ID123", если имени нет"""
+    if first_name and last_name:
+        name = f"{first_name} {last_name}"
+    else:
+        name = first_name or last_name or f"ID{user_id}"
+    return f"{name} (@{username})" if username else name
+
+
+def _read_file(path: str) -> bytes:
+    """Читает файл целиком; вызывается через asyncio.to_thread, чтобы не блокировать цикл событий"""
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+@lru_cache(maxsize=OFFLINE_PAYLOAD_CACHE_SIZE)
+def _parse_offline_payload(report_id: int, message_data: str) -> MappingProxyType:
+    """Разбирает message_data потенциального отчета с кэшем на процесс.
+    
+    Текст входит в ключ, поэтому измененная запись разбирается заново.
+    Ошибки разбора не кэшируются и пробрасываются вызывающему.
+    """
+    return MappingProxyType(_json_loads(message_data))
+
+
+@dataclass(slots=True)
+class TaskDraft:
+    """Черновик задания, который админ заполняет по шагам диалога"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    link: Optional[str] = None
+    open_date: Optional[datetime] = None
+    deadline: Optional[datetime] = None
+    # Поле правится из предпросмотра: после ввода вернуться к предпросмотру
+    from_preview: bool = False
+
+
+def _draft_from_template(template, now: datetime) -> TaskDraft:
+    """Черновик из шаблона: открывается сейчас, дедлайн через неделю в 23:59:59"""
+    return TaskDraft(
+        title=f"{template['title']} - {now:%d.%m.%Y}",
+        description=template['description'],
+        link=template['link'],
+        open_date=now,
+        deadline=(now + timedelta(days=7)).replace(hour=23, minute=59, second=59, microsecond=0),
+    )
+
+
+def _requires_admin(handler):
+    """Декоратор: пропускает в обработчик только администраторов.
+    
+    При отказе завершает диалог (ConversationHandler.END); для callback
+    отказ показывается через query.answer.
+    """
+    @wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not await self._check_admin_access(update, query=update.callback_query):
+            return ConversationHandler.END
+        return await handler(self, update, context)
+    return wrapper
+
 class AdminBot:
     def __init__(self):
         self.db = Database()
-        self.moscow_tz = pytz.timezone('Europe/Moscow')
+        # Кэш счетчиков меню: ключ -> (время получения, значения)
+        self._menu_cache: Dict[str, Tuple[float, Any]] = {}
+        # Названия существующих заданий (загружаются лениво, None - не загружены)
+        self._titles_cache: Optional[set] = None
         
         # ID администраторов (можно добавить несколько)
-        self.admin_ids = self._get_admin_ids()
-        
-    def _get_admin_ids(self) -> List[int]:
-        """Получает список ID администраторов из переменных окружения"""
-        admin_env = os.getenv('ADMIN_IDS', os.getenv('ADMIN_ID', ''))
-        if not admin_env:
-            logger.warning("ADMIN_IDS не найден в переменных окружения!")
-            return []
-        
-        # Проверяем специальное значение "all"
-        if admin_env.strip().lower() == 'all':
-            logger.warning("⚠️ РЕЖИМ ОТКРЫТОГО ДОСТУПА: Админ-бот доступен всем пользователям!")
-            return ['all']  # Специальный маркер
-        
-        admin_ids = []
-        for admin_id in admin_env.split(','):
-            try:
-                admin_ids.append(int(admin_id.strip()))
-            except ValueError:
-                logger.warning(f"Некорректный ADMIN_ID: {admin_id}")
+        self._admin_open, self._admin_ids = _parse_admin_env()
+        
+        self._build_callback_routes()
+        
+    def _build_callback_routes(self):
+        """Строит таблицы маршрутизации callback-кнопок.
+        
+        Все обработчики приводятся к единой сигнатуре (update, context, data).
+        Префиксы внутри семейства отсортированы по убыванию длины, чтобы
+        побеждал самый длинный (например, "task_reports_" раньше "task_").
+        """
+        self._exact_routes = {
+            "main_menu": lambda u, c, d: self._show_main_menu(u.callback_query),
+            "tasks_menu": lambda u, c, d: self._show_tasks_menu(u.callback_query),
+            "reports_menu": lambda u, c, d: self._show_reports_menu(u.callback_query),
+            "stats_menu": lambda u, c, d: self._show_stats_menu(u.callback_query),
+            "system_menu": lambda u, c, d: self._show_system_menu(u.callback_query),
+            "add_task": lambda u, c, d: self._show_add_task_menu(u.callback_query),
+            "list_tasks": lambda u, c, d: self._show_tasks_list(u.callback_query),
+            "pending_reports": lambda u, c, d: self._show_pending_reports(u.callback_query),
+            "all_reports": lambda u, c, d: self._show_all_reports(u.callback_query),
+            "potential_reports": lambda u, c, d: self._show_potential_reports(u.callback_query),
+            # Точный маршрут, иначе префикс "potential_" принял бы его за id отчета
+            "potential_reports_all": lambda u, c, d: self._show_potential_reports(u.callback_query, POTENTIAL_ALL_LIMIT),
+            "export_data": lambda u, c, d: self._handle_export_data(u.callback_query),
+            "clear_logs": lambda u, c, d: self._handle_clear_logs(u.callback_query),
+            "confirm_clear_logs": lambda u, c, d: self._confirm_clear_logs(u.callback_query),
+            # Функционал добавления заданий
+            "confirm_create_task": lambda u, c, d: self._confirm_create_task(u.callback_query, c),
+            "edit_task_preview": lambda u, c, d: self._edit_task_preview(u.callback_query, c),
+            "edit_preview_title": lambda u, c, d: self._start_preview_edit_title(u.callback_query, c, d),
+            "edit_preview_description": lambda u, c, d: self._start_preview_edit_description(u.callback_query, c, d),
+            "edit_preview_link": lambda u, c, d: self._start_preview_edit_link(u.callback_query, c, d),
+            "edit_preview_open_date": lambda u, c, d: self._start_preview_edit_open_date(u.callback_query, c, d),
+            "edit_preview_deadline": lambda u, c, d: self._start_preview_edit_deadline(u.callback_query, c, d),
+        }
+        
+        prefix_routes = {
+            "task_": lambda u, c, d: self._handle_task_action(u.callback_query, c, d),
+            "report_": lambda u, c, d: self._handle_report_action(u.callback_query, c, d),
+            "approve_": lambda u, c, d: self._approve_report(u.callback_query, d),
+            "reject_": lambda u, c, d: self._reject_report(u.callback_query, d),
+            "edit_task_": lambda u, c, d: self._start_edit_task(u.callback_query, c, d),
+            "toggle_task_": lambda u, c, d: self._toggle_task_status(u.callback_query, d),
+            "delete_task_": lambda u, c, d: self._delete_task(u.callback_query, d),
+            "confirm_delete_": lambda u, c, d: self._confirm_delete_task(u.callback_query, d),
+            "task_reports_": lambda u, c, d: self._show_task_reports(u.callback_query, d),
+            "user_profile_": lambda u, c, d: self._show_user_profile(u.callback_query, d),
+            "user_reports_": lambda u, c, d: self._show_user_reports(u.callback_query, d),
+            "export_": lambda u, c, d: self._handle_specific_export(u.callback_query, d),
+            "show_file_": lambda u, c, d: self._show_file(u.callback_query, d),
+            "potential_": lambda u, c, d: self._handle_potential_report(u.callback_query, d),
+            "assign_potential_": lambda u, c, d: self._assign_potential_to_task(u.callback_query, d),
+            "mark_processed_": lambda u, c, d: self._mark_potential_processed(u.callback_query, d),
+            "delete_potential_": lambda u, c, d: self._delete_potential_report(u.callback_query, d),
+            "show_potential_file_": lambda u, c, d: self._show_potential_file(u.callback_query, d),
+            "edit_title_": lambda u, c, d: self._start_edit_title(u, c),
+            "edit_desc_": lambda u, c, d: self._start_edit_description(u, c),
+            "edit_link_": lambda u, c, d: self._start_edit_link(u, c),
+            "edit_open_date_": lambda u, c, d: self._start_edit_open_date(u, c),
+            "edit_deadline_": lambda u, c, d: self._start_edit_deadline(u, c),
+            "template_": lambda u, c, d: self._handle_template_callback(u.callback_query, c, d),
+            "pending_after_": lambda u, c, d: self._show_pending_reports(u.callback_query, d.removeprefix('pending_after_')),
+            "all_reports_before_": lambda u, c, d: self._show_all_reports(u.callback_query, d.removeprefix('all_reports_before_')),
+            "list_tasks_after_": lambda u, c, d: self._show_tasks_list(u.callback_query, int(d.removeprefix('list_tasks_after_'))),
+        }
+        # Группируем префиксы по первому слову до "_", чтобы проверять
+        # только несколько кандидатов из одного семейства
+        buckets = {}
+        for prefix, route in sorted(prefix_routes.items(), key=lambda item: len(item[0]), reverse=True):
+            buckets.setdefault(prefix.partition('_')[0], []).append((prefix, route))
+        self._prefix_routes = {head: tuple(routes) for head, routes in buckets.items()}
         
-        logger.info(f"Загружены ID администраторов: {admin_ids}")
-        return admin_ids
-    
     def _is_admin(self, user_id: int) -> bool:
         """Проверяет, является ли пользователь администратором"""
-        # Если включен режим открытого доступа
-        if len(self.admin_ids) == 1 and self.admin_ids[0] == 'all':
-            return True
-        
-        return user_id in self.admin_ids
+        return self._admin_open or user_id in self._admin_ids
     
-    async def _check_admin_access(self, update: Update) -> bool:
-        """Проверяет права администратора и отправляет сообщение об ошибке если нет прав"""
+    async def _check_admin_access(self, update: Update, query=None) -> bool:
+        """Проверяет права администратора и отправляет сообщение об ошибке если нет прав
+        
+        Для callback-запросов (передан query) отказ показывается через
+        query.answer, без отдельного сообщения в чат.
+        """
         user_id = update.effective_user.id
         if not self._is_admin(user_id):
+            if query is not None:
+                await query.answer("⛔ Доступ запрещён", show_alert=True)
+                return False
             await update.effective_message.reply_text(
-                "❌ **Доступ запрещен**\n\n"
+                "❌ <b>Доступ запрещен</b>\n\n"
                 "Этот бот предназначен только для администраторов Эко-бота.",
-                parse_mode='Markdown'
+                parse_mode='HTML'
             )
             return False
         return True
 
+    def _run_counts_sync(self, queries) -> List[tuple]:
+        """Выполняет агрегирующие запросы на соединении из пула чтения (в рабочем потоке)"""
+        with self.db._get_read_connection() as conn:
+            cursor = conn.cursor()
+            rows = []
+            for sql in queries:
+                cursor.execute(sql)
+                rows.append(cursor.fetchone())
+        return rows
+    
+    async def _fetch_counts(self, queries) -> List[tuple]:
+        """Выполняет агрегирующие запросы, не блокируя цикл событий"""
+        return await asyncio.to_thread(self._run_counts_sync, queries)
+
+    def _run_reads_sync(self, queries) -> List[list]:
+        """Выполняет SELECT-запросы (sql, params) на одном соединении из пула чтения"""
+        with self.db._get_read_connection() as conn:
+            return [conn.execute(sql, params).fetchall() for sql, params in queries]
+
+    async def _fetch_rows(self, *queries) -> List[list]:
+        """Выполняет SELECT-запросы в рабочем потоке, возвращает строки каждого"""
+        return await asyncio.to_thread(self._run_reads_sync, queries)
+
+    async def _fetch_one(self, sql: str, params: tuple):
+        """Выполняет SELECT в рабочем потоке и возвращает первую строку или None"""
+        rows, = await self._fetch_rows((sql, params))
+        return rows[0] if rows else None
+
+    def _write_returning_sync(self, sql: str, params: tuple):
+        """Выполняет запись с RETURNING на общем соединении, возвращает первую строку (в рабочем потоке)"""
+        with self.db._get_connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    async def _cached_counts(self, key: str, queries) -> List[tuple]:
+        """Возвращает счетчики меню, кэшируя их на несколько секунд"""
+        now = time.monotonic()
+        cached = self._menu_cache.get(key)
+        if cached and now - cached[0] < MENU_CACHE_TTL:
+            return cached[1]
+        
+        counts = await self._fetch_counts(queries)
+        self._menu_cache[key] = (now, counts)
+        return counts
+    
+    async def _get_tasks_snapshot(self) -> List[tuple]:
+        """Возвращает список заданий со счетчиками отчетов из кэша или из БД"""
+        now = time.monotonic()
+        cached = self._menu_cache.get('tasks_list')
+        if cached and now - cached[0] < TASKS_LIST_CACHE_TTL:
+            return cached[1]
+        
+        tasks = await asyncio.to_thread(self.db.get_all_tasks_with_counts)
+        self._menu_cache['tasks_list'] = (now, tasks)
+        return tasks
+    
+    def _invalidate_menu_cache(self):
+        """Сбрасывает кэш счетчиков после изменений, сделанных админом"""
+        self._menu_cache.clear()
+
+    def _write_sync(self, sql: str, params: tuple) -> int:
+        """Выполняет одну запись отдельной транзакцией на общем соединении (в рабочем потоке)"""
+        with self.db._get_connection() as conn:
+            return conn.execute(sql, params).rowcount
+
+    async def _write(self, sql: str, params: tuple) -> int:
+        """Записывает в БД, не блокируя цикл событий, и сбрасывает кэш меню.
+        
+        Возвращает число измененных строк; ошибка записи пробрасывается
+        только вызвавшему обработчику.
+        """
+        rowcount = await asyncio.to_thread(self._write_sync, sql, params)
+        self._invalidate_menu_cache()
+        return rowcount
+
+    @_requires_admin
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
-        if not await self._check_admin_access(update):
-            return
-        
-        user = update.effective_user
-        
-        welcome_text = (
-            f"🔧 **Админ-панель Эко-бота**\n\n"
-            f"Добро пожаловать, {user.first_name}!\n\n"
-            f"Доступные функции:\n"
-            f"• 📋 Управление заданиями\n"
-            f"• 📤 Просмотр отчетов\n"
-            f"• ✅ Модерация отчетов\n"
-            f"• 📊 Статистика\n"
-            f"• 🔧 Системные функции\n\n"
-            f"Выберите действие:"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("📋 Задания", callback_data="tasks_menu")],
-            [InlineKeyboardButton("📤 Отчеты", callback_data="reports_menu")],
-            [InlineKeyboardButton("📊 Статистика", callback_data="stats_menu")],
-            [InlineKeyboardButton("🔧 Система", callback_data="system_menu")]
-        ]
+        # Экранируем имя один раз и храним его в данных пользователя
+        safe_name = html.escape(update.effective_user.first_name or "")
+        context.user_data['safe_name'] = safe_name
         
         await update.message.reply_text(
-            welcome_text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _WELCOME_TEXT.format(first_name=safe_name),
+            parse_mode='HTML',
+            reply_markup=_MAIN_MENU_MARKUP
         )
 
+    @_requires_admin
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик callback кнопок"""
-        if not await self._check_admin_access(update):
-            return
+        """Обработчик callback кнопок
         
+        Возвращает результат обработчика кнопки: для кнопок правки предпросмотра
+        это состояние диалога создания задания.
+        """
         query = update.callback_query
         await query.answer()
         
         data = query.data
         
-        if data == "main_menu":
-            await self._show_main_menu(query)
-        elif data == "tasks_menu":
-            await self._show_tasks_menu(query)
-        elif data == "reports_menu":
-            await self._show_reports_menu(query)
-        elif data == "stats_menu":
-            await self._show_stats_menu(query)
-        elif data == "system_menu":
-            await self._show_system_menu(query)
-        elif data == "add_task":
-            await self._show_add_task_menu(query)
-        elif data == "list_tasks":
-            await self._show_tasks_list(query)
-        elif data == "pending_reports":
-            await self._show_pending_reports(query)
-        elif data == "all_reports":
-            await self._show_all_reports(query)
-        elif data == "potential_reports":
-            await self._show_potential_reports(query)
-        elif data.startswith("task_"):
-            await self._handle_task_action(query, context, data)
-        elif data.startswith("report_"):
-            await self._handle_report_action(query, context, data)
-        elif data.startswith("approve_"):
-            await self._approve_report(query, data)
-        elif data.startswith("reject_"):
-            await self._reject_report(query, data)
-        elif data == "edit_task_preview":
-            await self._edit_task_preview(query, context)
-        elif data.startswith("edit_task_"):
-            await self._start_edit_task(query, context, data)
-        elif data.startswith("toggle_task_"):
-            await self._toggle_task_status(query, data)
-        elif data.startswith("delete_task_"):
-            await self._delete_task(query, data)
-        elif data.startswith("confirm_delete_"):
-            await self._confirm_delete_task(query, data)
-        elif data.startswith("task_reports_"):
-            task_id = int(data.split('_')[2])  # task_reports_123
-            await self._show_task_reports(query, f"task_reports_{task_id}")
-        elif data.startswith("user_profile_"):
-            await self._show_user_profile(query, data)
-        elif data.startswith("user_reports_"):
-            await self._show_user_reports(query, data)
-        elif data == "export_data":
-            await self._handle_export_data(query)
-        elif data == "clear_logs":
-            await self._handle_clear_logs(query)
-        elif data == "confirm_clear_logs":
-            await self._confirm_clear_logs(query)
-        elif data.startswith("export_"):
-            await self._handle_specific_export(query, data)
-        elif data.startswith("show_file_"):
-            await self._show_file(query, data)
-        elif data.startswith("potential_"):
-            await self._handle_potential_report(query, data)
-        elif data.startswith("assign_potential_"):
-            await self._assign_potential_to_task(query, data)
-        elif data.startswith("mark_processed_"):
-            await self._mark_potential_processed(query, data)
-        elif data.startswith("delete_potential_"):
-            await self._delete_potential_report(query, data)
-        elif data.startswith("show_potential_file_"):
-            await self._show_potential_file(query, data)
-        elif data.startswith("edit_title_"):
-            await self._start_edit_title(update, context)
-        elif data.startswith("edit_desc_"):
-            await self._start_edit_description(update, context)
-        elif data.startswith("edit_link_"):
-            await self._start_edit_link(update, context)
-        elif data.startswith("edit_open_date_"):
-            await self._start_edit_open_date(update, context)
-        elif data.startswith("edit_deadline_"):
-            await self._start_edit_deadline(update, context)
-        # Новые обработчики для функционала добавления заданий
-        elif data.startswith("template_"):
-            await self._handle_template_callback(query, context, data)
-        elif data == "confirm_create_task":
-            await self._confirm_create_task(query, context)
-        elif data == "edit_task_preview":
-            await self._edit_task_preview(query, context)
-        elif data == "edit_preview_title":
-            await self._start_preview_edit_title(query, context, data)
-        elif data == "edit_preview_description":
-            await self._start_preview_edit_description(query, context, data)
-        elif data == "edit_preview_link":
-            await self._start_preview_edit_link(query, context, data)
-        elif data == "edit_preview_open_date":
-            await self._start_preview_edit_open_date(query, context, data)
-        elif data == "edit_preview_deadline":
-            await self._start_preview_edit_deadline(query, context, data)
-
+        # Сначала точное совпадение, затем самый длинный подходящий префикс
+        handler = self._exact_routes.get(data)
+        if handler is None:
+            for prefix, route in self._prefix_routes.get(data.partition('_')[0], ()):
+                if data.startswith(prefix):
+                    handler = route
+                    break
+            else:
+                return
+        
+        return await handler(update, context, data)
 
     async def _handle_template_callback(self, query, context, data):
         """Обрабатывает выбор шаблона через callback"""
-        template_type = data.replace('template_', '')
-        
-        # Применяем шаблон
-        templates = {
-            'observation': {
-                'title': 'Экологическое наблюдение',
-                'description': 'Проведите наблюдение за природой в вашем районе. Сфотографируйте интересные природные объекты и поделитесь своими наблюдениями.',
-                'link': None
-            },
-            'action': {
-                'title': 'Экологическое действие',
-                'description': 'Совершите одно полезное действие для окружающей среды. Это может быть уборка территории, посадка растений или сортировка отходов.',
-                'link': None
-            },
-            'research': {
-                'title': 'Исследование природы',
-                'description': 'Проведите небольшое исследование природного объекта в вашем районе. Изучите его особенности и поделитесь результатами.',
-                'link': None
-            }
-        }
+        template_type = data.removeprefix('template_')
         
-        template = templates.get(template_type)
-        if not template:
+        base = _TEMPLATES.get(template_type)
+        if not base:
             await query.edit_message_text("❌ Неизвестный шаблон!")
             return
         
         # Применяем шаблон
-        current_date = datetime.now(self.moscow_tz)
-        template['title'] = f"{template['title']} - {current_date.strftime('%d.%m.%Y')}"
-        
-        context.user_data['adding_task'] = template.copy()
-        context.user_data['adding_task']['open_date'] = current_date
-        
-        # Автоматически устанавливаем дедлайн (через неделю)
-        deadline = current_date + timedelta(days=7)
-        deadline = deadline.replace(hour=23, minute=59, second=59)
-        context.user_data['adding_task']['deadline'] = deadline
+        draft = _draft_from_template(base, datetime.now(MOSCOW_TZ))
+        context.user_data['adding_task'] = draft
         
         # Показываем предварительный просмотр
-        preview_text = self._generate_task_preview(context.user_data['adding_task'], deadline)
-        
-        keyboard = [
-            [InlineKeyboardButton("✅ Создать задание", callback_data="confirm_create_task")],
-            [InlineKeyboardButton("✏️ Изменить", callback_data="edit_task_preview")],
-            [InlineKeyboardButton("❌ Отменить", callback_data="tasks_menu")]
-        ]
+        preview_text = self._generate_task_preview(draft, draft.deadline)
         
         await query.edit_message_text(
-            f"🎯 **Шаблон '{template_type}' применен!**\n\n{preview_text}",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
+            f"🎯 <b>Шаблон '{template_type}' применен!</b>\n\n{preview_text}",
+            parse_mode='HTML',
+            reply_markup=_PREVIEW_MARKUP
+        )
+
+    def _clear_dialog_state(self, context):
+        """Удаляет из user_data только данные диалогов создания и редактирования"""
+        for key in _DIALOG_KEYS:
+            context.user_data.pop(key, None)
+
+    def _fmt_task_fields(self, task: TaskDraft, open_date: datetime, is_open: bool = False) -> Dict[str, str]:
+        """Готовит поля черновика задания (уже экранированные для HTML) для шаблонов сообщений"""
+        description = task.description
+        deadline = task.deadline
+        return {
+            'title': html.escape(task.title),
+            'desc_short': html.escape(description[:100]) + ('...' if len(description) > 100 else ''),
+            'link': html.escape(task.link or 'не указана'),
+            'open': _fmt_long(open_date),
+            'deadline': _fmt_long(deadline) if deadline else 'не установлен',
+            'status': 'Открыто' if is_open else 'Ожидает открытия',
+            'avail': 'доступно пользователям' if is_open else 'будет открыто в указанное время',
+        }
 
     async def _confirm_create_task(self, query, context):
         """Подтверждает создание задания"""
-        task_data = context.user_data.get('adding_task', {})
+        task_data = context.user_data.get('adding_task')
         
-        if not task_data:
+        if task_data is None or task_data.title is None:
             await query.edit_message_text("❌ Данные задания не найдены. Начните заново.")
             return
         
         try:
             # Создаем задание в базе данных
             # Определяем, открыто ли задание сейчас
-            open_date = task_data.get('open_date', datetime.now(self.moscow_tz))
-            is_open = open_date <= datetime.now(self.moscow_tz)
-            
-            self.db.add_task(
-                title=task_data['title'],
-                description=task_data['description'],
-                link=task_data['link'],
+            now = datetime.now(MOSCOW_TZ)
+            open_date = task_data.open_date or now
+            is_open = open_date <= now
+            
+            task_id = await asyncio.to_thread(
+                self.db.add_task,
+                title=task_data.title,
+                description=task_data.description,
+                link=task_data.link,
                 week_number=None,  # Больше не используем номер недели
-                deadline=task_data['deadline'],
+                deadline=task_data.deadline,
                 is_open=is_open,
                 open_date=open_date
             )
             
-            # Получаем ID созданного задания
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id FROM tasks WHERE title = ? ORDER BY id DESC LIMIT 1', (task_data['title'],))
-                task_id = cursor.fetchone()[0]
-            
-            success_text = (
-                "✅ **ЗАДАНИЕ УСПЕШНО СОЗДАНО!**\n\n"
-                f"🆔 **ID задания:** {task_id}\n"
-                f"📝 **Название:** {task_data['title']}\n"
-                f"📄 **Описание:** {task_data['description'][:100]}{'...' if len(task_data['description']) > 100 else ''}\n"
-                f"🔗 **Ссылка:** {task_data['link'] or 'не указана'}\n"
-                f"📅 **Открытие:** {open_date.strftime('%d.%m.%Y в %H:%M МСК')}\n"
-                f"⏰ **Дедлайн:** {task_data['deadline'].strftime('%d.%m.%Y в %H:%M МСК') if task_data['deadline'] else 'не установлен'}\n"
-                f"🟢 **Статус:** {'Открыто' if is_open else 'Ожидает открытия'}\n\n"
-                f"🎉 **Задание {'доступно пользователям' if is_open else 'будет открыто в указанное время'}!**"
-            )
+            fields = self._fmt_task_fields(task_data, open_date, is_open)
+            success_text = _SUCCESS_TEMPLATE.format_map({**fields, 'id': task_id})
             
             keyboard = [
                 [InlineKeyboardButton("➕ Создать еще задание", callback_data="add_task")],
                 [InlineKeyboardButton("📋 Посмотреть задание", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
             await query.edit_message_text(
                 success_text,
-                parse_mode='Markdown',
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
-            # Очищаем данные
-            context.user_data.clear()
+            # Очищаем только данные этого диалога
+            context.user_data.pop('adding_task', None)
+            self._invalidate_menu_cache()
+            if self._titles_cache is not None:
+                self._titles_cache.add(task_data.title)
             
             # Логируем успешное создание
-            logger.info(f"Создано новое задание: '{task_data['title']}' (ID: {task_id})")
+            logger.info(f"Создано новое задание: '{task_data.title}' (ID: {task_id})")
             
         except Exception as e:
             logger.error(f"Ошибка при создании задания: {e}")
             
             error_text = (
-                "❌ **ОШИБКА ПРИ СОЗДАНИИ ЗАДАНИЯ**\n\n"
-                f"Произошла ошибка: {str(e)}\n\n"
+                "❌ <b>ОШИБКА ПРИ СОЗДАНИИ ЗАДАНИЯ</b>\n\n"
+                f"Произошла ошибка: {html.escape(str(e))}\n\n"
                 "Попробуйте еще раз или обратитесь к разработчику."
             )
             
@@ -372,29 +871,20 @@ class AdminBot:
             
             await query.edit_message_text(
                 error_text,
-                parse_mode='Markdown',
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
 
     async def _edit_task_preview(self, query, context):
         """Позволяет редактировать данные задания перед созданием"""
-        task_data = context.user_data.get('adding_task', {})
+        task_data = context.user_data.get('adding_task')
         
-        if not task_data:
+        if task_data is None or task_data.title is None:
             await query.edit_message_text("❌ Данные задания не найдены. Начните заново.")
             return
         
-        open_date = task_data.get('open_date', datetime.now(self.moscow_tz))
-        
-        text = (
-            "✏️ **РЕДАКТИРОВАНИЕ ЗАДАНИЯ**\n\n"
-            f"📝 **Название:** {task_data['title']}\n"
-            f"📄 **Описание:** {task_data['description'][:100]}{'...' if len(task_data['description']) > 100 else ''}\n"
-            f"🔗 **Ссылка:** {task_data['link'] or 'не указана'}\n"
-            f"📅 **Открытие:** {open_date.strftime('%d.%m.%Y в %H:%M МСК')}\n"
-            f"⏰ **Дедлайн:** {task_data['deadline'].strftime('%d.%m.%Y в %H:%M МСК') if task_data['deadline'] else 'не установлен'}\n\n"
-            f"Что хотите изменить?"
-        )
+        open_date = task_data.open_date or datetime.now(MOSCOW_TZ)
+        text = _EDIT_PREVIEW_TEMPLATE.format_map(self._fmt_task_fields(task_data, open_date))
         
         keyboard = [
             [InlineKeyboardButton("📝 Название", callback_data="edit_preview_title")],
@@ -408,156 +898,132 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _start_preview_edit_title(self, query, context, data):
         """Начинает редактирование названия в предварительном просмотре"""
-        task_data = context.user_data.get('adding_task', {})
-        current_title = task_data.get('title', '')
+        task_data = context.user_data.setdefault('adding_task', TaskDraft())
+        task_data.from_preview = True
+        current_title = task_data.title or ''
         
         text = (
-            "✏️ **Редактирование названия**\n\n"
-            f"📝 **Текущее название:** {current_title}\n\n"
+            "✏️ <b>Редактирование названия</b>\n\n"
+            f"📝 <b>Текущее название:</b> {html.escape(current_title)}\n\n"
             "Введите новое название задания:"
         )
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(text, parse_mode='HTML')
         # Переводим в состояние редактирования названия
         return ADDING_TASK_TITLE
 
     async def _start_preview_edit_description(self, query, context, data):
         """Начинает редактирование описания в предварительном просмотре"""
-        task_data = context.user_data.get('adding_task', {})
-        current_description = task_data.get('description', '')
+        task_data = context.user_data.setdefault('adding_task', TaskDraft())
+        task_data.from_preview = True
+        current_description = task_data.description or ''
         
         text = (
-            "✏️ **Редактирование описания**\n\n"
-            f"📄 **Текущее описание:** {current_description[:200]}{'...' if len(current_description) > 200 else ''}\n\n"
+            "✏️ <b>Редактирование описания</b>\n\n"
+            f"📄 <b>Текущее описание:</b> {html.escape(current_description[:200])}{'...' if len(current_description) > 200 else ''}\n\n"
             "Введите новое описание задания:"
         )
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(text, parse_mode='HTML')
         # Переводим в состояние редактирования описания
         return ADDING_TASK_DESCRIPTION
 
     async def _start_preview_edit_link(self, query, context, data):
         """Начинает редактирование ссылки в предварительном просмотре"""
-        task_data = context.user_data.get('adding_task', {})
-        current_link = task_data.get('link') or 'не указана'
+        task_data = context.user_data.setdefault('adding_task', TaskDraft())
+        task_data.from_preview = True
+        current_link = task_data.link or 'не указана'
         
         text = (
-            "✏️ **Редактирование ссылки**\n\n"
-            f"🔗 **Текущая ссылка:** {current_link}\n\n"
+            "✏️ <b>Редактирование ссылки</b>\n\n"
+            f"🔗 <b>Текущая ссылка:</b> {html.escape(current_link)}\n\n"
             "Введите новую ссылку или 'нет' чтобы убрать:"
         )
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(text, parse_mode='HTML')
         # Переводим в состояние редактирования ссылки
         return ADDING_TASK_LINK
 
     async def _start_preview_edit_open_date(self, query, context, data):
         """Начинает редактирование даты открытия в предварительном просмотре"""
-        task_data = context.user_data.get('adding_task', {})
-        current_date = task_data.get('open_date', datetime.now(self.moscow_tz))
+        task_data = context.user_data.setdefault('adding_task', TaskDraft())
+        task_data.from_preview = True
+        current_date = task_data.open_date or datetime.now(MOSCOW_TZ)
         
         text = (
-            "✏️ **Редактирование даты открытия**\n\n"
-            f"📅 **Текущая дата:** {current_date.strftime('%d.%m.%Y в %H:%M МСК')}\n\n"
+            "✏️ <b>Редактирование даты открытия</b>\n\n"
+            f"📅 <b>Текущая дата:</b> {_fmt_long(current_date)}\n\n"
             "Введите новую дату открытия:\n"
-            "• `сейчас` - открыть сейчас\n"
-            "• `завтра` - завтра в 09:00\n"
-            "• `ДД.ММ.ГГГГ ЧЧ:ММ` - конкретная дата"
+            "• <code>сейчас</code> - открыть сейчас\n"
+            "• <code>завтра</code> - завтра в 09:00\n"
+            "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> - конкретная дата"
         )
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(text, parse_mode='HTML')
         # Переводим в состояние редактирования даты открытия
         return ADDING_TASK_OPEN_DATE
 
     async def _start_preview_edit_deadline(self, query, context, data):
         """Начинает редактирование дедлайна в предварительном просмотре"""
-        task_data = context.user_data.get('adding_task', {})
-        current_deadline = task_data.get('deadline')
+        task_data = context.user_data.setdefault('adding_task', TaskDraft())
+        task_data.from_preview = True
+        current_deadline = task_data.deadline
         
         if current_deadline:
-            deadline_str = current_deadline.strftime('%d.%m.%Y в %H:%M МСК')
+            deadline_str = _fmt_long(current_deadline)
         else:
             deadline_str = 'не установлен'
         
         text = (
-            "✏️ **Редактирование дедлайна**\n\n"
-            f"⏰ **Текущий дедлайн:** {deadline_str}\n\n"
+            "✏️ <b>Редактирование дедлайна</b>\n\n"
+            f"⏰ <b>Текущий дедлайн:</b> {deadline_str}\n\n"
             "Введите новый дедлайн:\n"
-            "• `авто` - автоматический расчет\n"
-            "• `завтра` - завтра в 23:59\n"
-            "• `ДД.ММ.ГГГГ ЧЧ:ММ` - конкретная дата\n"
-            "• `нет` - без дедлайна"
+            "• <code>авто</code> - автоматический расчет\n"
+            "• <code>завтра</code> - завтра в 23:59\n"
+            "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> - конкретная дата\n"
+            "• <code>нет</code> - без дедлайна"
         )
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(text, parse_mode='HTML')
         # Переводим в состояние редактирования дедлайна
         return ADDING_TASK_DEADLINE
 
     async def _show_main_menu(self, query):
         """Показывает главное меню"""
-        text = (
-            "🔧 **Админ-панель Эко-бота**\n\n"
-            "Выберите раздел для работы:"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("📋 Задания", callback_data="tasks_menu")],
-            [InlineKeyboardButton("📤 Отчеты", callback_data="reports_menu")],
-            [InlineKeyboardButton("📊 Статистика", callback_data="stats_menu")],
-            [InlineKeyboardButton("🔧 Система", callback_data="system_menu")]
-        ]
-        
         await query.edit_message_text(
-            text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _MAIN_MENU_TEXT,
+            parse_mode='HTML',
+            reply_markup=_MAIN_MENU_MARKUP
         )
 
     async def _show_tasks_menu(self, query):
         """Показывает меню управления заданиями"""
-        text = (
-            "📋 **Управление заданиями**\n\n"
-            "Выберите действие:"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить задание", callback_data="add_task")],
-            [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
-        ]
-        
         await query.edit_message_text(
-            text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _TASKS_MENU_TEXT,
+            parse_mode='HTML',
+            reply_markup=_TASKS_MENU_MARKUP
         )
 
     async def _show_reports_menu(self, query):
         """Показывает меню работы с отчетами"""
-        # Получаем статистику отчетов
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Ожидающие проверки
-            cursor.execute("SELECT COUNT(*) FROM submissions WHERE status = 'pending'")
-            pending_count = cursor.fetchone()[0]
-            
-            # Всего отчетов
-            cursor.execute("SELECT COUNT(*) FROM submissions")
-            total_count = cursor.fetchone()[0]
-            
-            # Потенциальные отчеты
-            cursor.execute("SELECT COUNT(*) FROM offline_messages WHERE message_type = 'potential_report' AND processed = FALSE")
-            potential_count = cursor.fetchone()[0]
+        # Получаем статистику отчетов одним запросом
+        [(pending_count, total_count, potential_count)] = await self._cached_counts('reports', ('''
+            SELECT
+                (SELECT COUNT(*) FROM submissions WHERE status = 'pending'),
+                (SELECT COUNT(*) FROM submissions),
+                (SELECT COUNT(*) FROM offline_messages
+                 WHERE message_type = 'potential_report' AND processed = FALSE
+                   AND json_valid(message_data))
+        ''',))
         
         text = (
-            "📤 **Работа с отчетами**\n\n"
+            "📤 <b>Работа с отчетами</b>\n\n"
             f"⏳ Ожидают проверки: {pending_count}\n"
             f"📝 Всего отчетов: {total_count}\n"
             f"🔍 Потенциальные отчеты: {potential_count}\n\n"
@@ -568,285 +1034,200 @@ class AdminBot:
             [InlineKeyboardButton(f"⏳ Ожидающие проверки ({pending_count})", callback_data="pending_reports")],
             [InlineKeyboardButton("📤 Все отчеты", callback_data="all_reports")],
             [InlineKeyboardButton(f"🔍 Потенциальные ({potential_count})", callback_data="potential_reports")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ]
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _show_stats_menu(self, query):
         """Показывает статистику"""
-        # Получаем статистику
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Пользователи
-            cursor.execute('SELECT COUNT(*) FROM users')
-            total_users = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM users WHERE registration_completed = TRUE')
-            registered_users = cursor.fetchone()[0]
-            
-            # Задания
-            cursor.execute('SELECT COUNT(*) FROM tasks')
-            total_tasks = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM tasks WHERE is_open = TRUE')
-            open_tasks = cursor.fetchone()[0]
-            
-            # Отчеты
-            cursor.execute('SELECT COUNT(*) FROM submissions')
-            total_submissions = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE status = "pending"')
-            pending_submissions = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE status = "approved"')
-            approved_submissions = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE is_on_time = TRUE')
-            on_time_submissions = cursor.fetchone()[0]
+        # Получаем статистику: пользователи, задания, отчеты
+        (
+            (total_users, registered_users),
+            (total_tasks, open_tasks),
+            (total_submissions, pending_submissions, approved_submissions, on_time_submissions),
+        ) = await self._cached_counts('stats', (
+            '''
+                SELECT COUNT(*), COALESCE(SUM(registration_completed = TRUE), 0)
+                FROM users
+            ''',
+            '''
+                SELECT COUNT(*), COALESCE(SUM(is_open = TRUE), 0)
+                FROM tasks
+            ''',
+            '''
+                SELECT COUNT(*),
+                       COALESCE(SUM(status = 'pending'), 0),
+                       COALESCE(SUM(status = 'approved'), 0),
+                       COALESCE(SUM(is_on_time = TRUE), 0)
+                FROM submissions
+            ''',
+        ))
         
         text = (
-            "📊 **Статистика Эко-бота**\n\n"
-            f"👥 **Пользователи:**\n"
+            "📊 <b>Статистика Эко-бота</b>\n\n"
+            f"👥 <b>Пользователи:</b>\n"
             f"   • Всего: {total_users}\n"
             f"   • Зарегистрированы: {registered_users}\n\n"
-            f"📋 **Задания:**\n"
+            f"📋 <b>Задания:</b>\n"
             f"   • Всего: {total_tasks}\n"
             f"   • Открытых: {open_tasks}\n\n"
-            f"📤 **Отчеты:**\n"
+            f"📤 <b>Отчеты:</b>\n"
             f"   • Всего: {total_submissions}\n"
             f"   • Ожидают проверки: {pending_submissions}\n"
             f"   • Одобрены: {approved_submissions}\n"
             f"   • Отправлены в срок: {on_time_submissions}\n\n"
-            f"📈 **Активность:**\n"
+            f"📈 <b>Активность:</b>\n"
             f"   • Процент завершения регистрации: {registered_users/max(total_users, 1)*100:.1f}%\n"
             f"   • Процент одобренных отчетов: {approved_submissions/max(total_submissions, 1)*100:.1f}%\n"
             f"   • Процент отчетов в срок: {on_time_submissions/max(total_submissions, 1)*100:.1f}%"
         )
         
-        keyboard = [
-            [InlineKeyboardButton("🔄 Обновить", callback_data="stats_menu")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
-        ]
-        
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode='HTML',
+            reply_markup=_STATS_REFRESH_MARKUP
         )
 
     async def _show_system_menu(self, query):
         """Показывает системное меню"""
-        text = (
-            "🔧 **Системные функции**\n\n"
-            "Доступные действия:"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("📊 Экспорт данных", callback_data="export_data")],
-            [InlineKeyboardButton("🧹 Очистка логов", callback_data="clear_logs")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
-        ]
-        
         await query.edit_message_text(
-            text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _SYSTEM_MENU_TEXT,
+            parse_mode='HTML',
+            reply_markup=_SYSTEM_MENU_MARKUP
         )
 
     async def _show_add_task_menu(self, query):
         """Показывает меню добавления задания"""
-        text = (
-            "➕ **Добавление нового задания**\n\n"
-            "🚀 **Быстрый старт:**\n"
-            "• Используйте шаблоны для типовых заданий\n"
-            "• Автоматический расчет дедлайнов\n"
-            "• Предварительный просмотр перед созданием\n\n"
-            "Выберите способ создания задания:"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("🎯 Шаблон: Наблюдение", callback_data="template_observation")],
-            [InlineKeyboardButton("🌱 Шаблон: Действие", callback_data="template_action")],
-            [InlineKeyboardButton("🔬 Шаблон: Исследование", callback_data="template_research")],
-            [InlineKeyboardButton("✏️ Создать с нуля", callback_data="create_manual")],
-            [InlineKeyboardButton("❌ Отмена", callback_data="tasks_menu")]
-        ]
-        
         await query.edit_message_text(
-            text, 
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _ADD_TASK_MENU_TEXT,
+            parse_mode='HTML',
+            reply_markup=_ADD_TASK_MENU_MARKUP
         )
 
+    @_requires_admin
     async def _start_add_task_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Начинает диалог создания задания с нуля"""
         query = update.callback_query
         await query.answer()
         
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
-        context.user_data['adding_task'] = {}
-        
-        text = (
-            "➕ **Создание задания с нуля**\n\n"
-            "📝 **Шаг 1/5:** Введите название задания\n"
-            "💡 *Минимум 5 символов, максимум 100*\n\n"
-            "⚡ **Быстрые команды:**\n"
-            "• `/template_observation` - Экологическое наблюдение\n"
-            "• `/template_action` - Экологическое действие\n"
-            "• `/template_research` - Исследование природы\n\n"
-            "🔧 *Для отмены введите* `/cancel`"
-        )
+        context.user_data['adding_task'] = TaskDraft()
         
-        await query.edit_message_text(text, parse_mode='Markdown')
+        await query.edit_message_text(_STEP1_TEXT, parse_mode='HTML')
         return ADDING_TASK_TITLE
 
+    async def _leave_add_task_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Завершает диалог создания задания при нажатии любой другой кнопки.
+        
+        Сама кнопка обрабатывается как обычно, а текст админа дальше снова
+        попадает в handle_edit_message, а не в шаги диалога.
+        """
+        await self.handle_callback(update, context)
+        return ConversationHandler.END
+
     async def _start_add_task(self, query, context):
         """Начинает процесс добавления задания"""
-        context.user_data['adding_task'] = {}
-        
-        # Получаем текущую неделю для подсказки
-        current_week = datetime.now(self.moscow_tz).isocalendar()[1]
-        
-        text = (
-            "➕ **Добавление нового задания**\n\n"
-            "🚀 **Быстрый старт:**\n"
-            "• Используйте шаблоны для типовых заданий\n"
-            "• Автоматический расчет дедлайнов\n"
-            "• Предварительный просмотр перед созданием\n\n"
-            "📝 **Шаг 1/5:** Введите название задания\n"
-            "💡 *Минимум 5 символов, максимум 100*\n\n"
-            "⚡ **Быстрые шаблоны:**\n"
-            "• `/template_observation` - Экологическое наблюдение\n"
-            "• `/template_action` - Экологическое действие\n"
-            "• `/template_research` - Исследование природы\n\n"
-            "🔧 *Для отмены введите* `/cancel`"
-        )
-        
-        keyboard = [
-            [InlineKeyboardButton("🎯 Шаблон: Наблюдение", callback_data="template_observation")],
-            [InlineKeyboardButton("🌱 Шаблон: Действие", callback_data="template_action")],
-            [InlineKeyboardButton("🔬 Шаблон: Исследование", callback_data="template_research")],
-            [InlineKeyboardButton("❌ Отмена", callback_data="tasks_menu")]
-        ]
+        context.user_data['adding_task'] = TaskDraft()
         
         await query.edit_message_text(
-            text, 
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            _ADD_TASK_START_TEXT,
+            parse_mode='HTML',
+            reply_markup=_TEMPLATE_PICK_MARKUP
         )
         return ADDING_TASK_TITLE
 
+    @_requires_admin
     async def handle_add_task_title(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод названия задания"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
         title = update.message.text.strip()
         
         # Проверка на команды шаблонов
         if title.startswith('/template_'):
-            template_type = title.replace('/template_', '')
-            return await self._apply_task_template(update, context, template_type)
+            return await self._apply_task_template(update, context, title.removeprefix('/template_'))
         
         # Валидация названия
         if len(title) < 5:
             await update.message.reply_text(
-                "❌ **Название слишком короткое**\n\n"
+                "❌ <b>Название слишком короткое</b>\n\n"
                 "Название задания должно содержать минимум 5 символов.\n"
-                "Попробуйте еще раз или используйте шаблон:"
+                "Попробуйте еще раз или используйте шаблон:",
+                parse_mode='HTML'
             )
             return ADDING_TASK_TITLE
         
         if len(title) > 100:
             await update.message.reply_text(
-                "❌ **Название слишком длинное**\n\n"
+                "❌ <b>Название слишком длинное</b>\n\n"
                 "Название задания не должно превышать 100 символов.\n"
-                "Попробуйте сократить:"
+                "Попробуйте сократить:",
+                parse_mode='HTML'
             )
             return ADDING_TASK_TITLE
         
         # Проверка на дублирование
-        if self._check_task_title_exists(title):
+        if await self._check_task_title_exists(title):
             await update.message.reply_text(
-                "⚠️ **Задание с таким названием уже существует**\n\n"
-                "Измените название или добавьте уточнение (например, номер недели):"
+                "⚠️ <b>Задание с таким названием уже существует</b>\n\n"
+                "Измените название или добавьте уточнение (например, номер недели):",
+                parse_mode='HTML'
             )
             return ADDING_TASK_TITLE
         
-        context.user_data['adding_task']['title'] = title
-        
-        # Прогресс-бар
-        progress = "🟢🔘🔘🔘🔘"
+        draft = context.user_data['adding_task']
+        draft.title = title
+        if draft.from_preview:
+            return await self._return_to_preview(update, draft)
         
         await update.message.reply_text(
-            f"✅ **Название принято!**\n"
-            f"📝 *{title}*\n\n"
-            f"📊 **Прогресс:** {progress} (1/5)\n\n"
-            f"📄 **Шаг 2/5:** Введите описание задания\n"
-            f"💡 *Опишите, что должны сделать участники*\n\n"
-            f"📋 **Примеры хорошего описания:**\n"
-            f"• Сфотографируйте 3 вида растений в вашем районе\n"
-            f"• Проведите уборку территории площадью 100 кв.м\n"
-            f"• Измерьте температуру воды в ближайшем водоеме"
+            _STEP2_TEXT_TEMPLATE.format(title=html.escape(title)),
+            parse_mode='HTML'
         )
         return ADDING_TASK_DESCRIPTION
 
+    @_requires_admin
     async def handle_add_task_description(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод описания задания"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
         description = update.message.text.strip()
         
         # Валидация описания
         if len(description) < 10:
             await update.message.reply_text(
-                "❌ **Описание слишком короткое**\n\n"
+                "❌ <b>Описание слишком короткое</b>\n\n"
                 "Описание должно содержать минимум 10 символов.\n"
-                "Добавьте больше деталей о том, что нужно сделать:"
+                "Добавьте больше деталей о том, что нужно сделать:",
+                parse_mode='HTML'
             )
             return ADDING_TASK_DESCRIPTION
         
         if len(description) > 1000:
             await update.message.reply_text(
-                "❌ **Описание слишком длинное**\n\n"
+                "❌ <b>Описание слишком длинное</b>\n\n"
                 "Описание не должно превышать 1000 символов.\n"
-                "Попробуйте сократить, оставив только самое важное:"
+                "Попробуйте сократить, оставив только самое важное:",
+                parse_mode='HTML'
             )
             return ADDING_TASK_DESCRIPTION
         
-        context.user_data['adding_task']['description'] = description
-        
-        # Прогресс-бар
-        progress = "🟢🟢🔘🔘🔘"
+        draft = context.user_data['adding_task']
+        draft.description = description
+        if draft.from_preview:
+            return await self._return_to_preview(update, draft)
         
         await update.message.reply_text(
-            f"✅ **Описание принято!**\n"
-            f"📄 *{description[:100]}{'...' if len(description) > 100 else ''}*\n\n"
-            f"📊 **Прогресс:** {progress} (2/5)\n\n"
-            f"🔗 **Шаг 3/5:** Введите ссылку на задание\n"
-            f"💡 *Необязательно - для дополнительных материалов*\n\n"
-            f"📋 **Варианты ввода:**\n"
-            f"• Полная ссылка: `https://example.com/task`\n"
-            f"• Без ссылки: `нет`, `no`, `-` или `пропустить`\n"
-            f"• Telegram канал: `@channel_name`",
-            parse_mode='Markdown'
+            _STEP3_TEXT_TEMPLATE.format(
+                desc_short=html.escape(description[:100]) + ('...' if len(description) > 100 else '')
+            ),
+            parse_mode='HTML'
         )
         return ADDING_TASK_LINK
 
+    @_requires_admin
     async def handle_add_task_link(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод ссылки задания"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
         link = update.message.text.strip()
         
         # Обработка отсутствия ссылки
@@ -856,180 +1237,142 @@ class AdminBot:
             # Валидация ссылки
             if not self._validate_url(link):
                 await update.message.reply_text(
-                    "❌ **Некорректная ссылка**\n\n"
-                    "Ссылка должна начинаться с `http://`, `https://` или `@` (для Telegram)\n\n"
-                    "📋 **Примеры корректных ссылок:**\n"
-                    "• `https://example.com/task`\n"
-                    "• `@eco_channel`\n"
-                    "• `https://t.me/eco_channel`\n\n"
-                    "Или введите `нет` если ссылка не нужна:",
-                    parse_mode='Markdown'
+                    "❌ <b>Некорректная ссылка</b>\n\n"
+                    "Ссылка должна начинаться с <code>http://</code>, <code>https://</code> или <code>@</code> (для Telegram)\n\n"
+                    "📋 <b>Примеры корректных ссылок:</b>\n"
+                    "• <code>https://example.com/task</code>\n"
+                    "• <code>@eco_channel</code>\n"
+                    "• <code>https://t.me/eco_channel</code>\n\n"
+                    "Или введите <code>нет</code> если ссылка не нужна:",
+                    parse_mode='HTML'
                 )
                 return ADDING_TASK_LINK
         
-        context.user_data['adding_task']['link'] = link
-        
-        # Получаем текущий номер недели
-        current_week = datetime.now(self.moscow_tz).isocalendar()[1]
-        
-        # Прогресс-бар
-        progress = "🟢🟢🟢🔘🔘"
+        draft = context.user_data['adding_task']
+        draft.link = link
+        if draft.from_preview:
+            return await self._return_to_preview(update, draft)
         
         await update.message.reply_text(
-            f"✅ **Ссылка {'добавлена' if link else 'пропущена'}!**\n"
-            f"🔗 *{link or 'не указана'}*\n\n"
-            f"📊 **Прогресс:** {progress} (3/5)\n\n"
-            f"📅 **Шаг 4/5:** Установите дату открытия задания\n"
-            f"💡 *Когда задание станет доступно пользователям*\n\n"
-            f"📋 **Варианты ввода:**\n"
-            f"• Сейчас: `сейчас` или `now`\n"
-            f"• Завтра: `завтра` или `tomorrow`\n"
-            f"• Конкретная дата: `ДД.ММ.ГГГГ` или `ДД.ММ.ГГГГ ЧЧ:ММ`\n"
-            f"• Через неделю: `неделя` или `week`"
+            _STEP4_TEXT_TEMPLATE.format(
+                status='добавлена' if link else 'пропущена',
+                link=html.escape(link or 'не указана')
+            ),
+            parse_mode='HTML'
         )
         return ADDING_TASK_OPEN_DATE
 
+    @_requires_admin
     async def handle_add_task_open_date(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод даты открытия задания"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
         open_date_input = update.message.text.strip().lower()
+        now = datetime.now(MOSCOW_TZ)
         
         try:
             # Обработка различных вариантов ввода
-            if open_date_input in ['сейчас', 'now']:
-                open_date = datetime.now(self.moscow_tz)
-            elif open_date_input in ['завтра', 'tomorrow']:
-                open_date = datetime.now(self.moscow_tz) + timedelta(days=1)
-                open_date = open_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            elif open_date_input in ['неделя', 'week']:
-                open_date = datetime.now(self.moscow_tz) + timedelta(weeks=1)
-                open_date = open_date.replace(hour=9, minute=0, second=0, microsecond=0)
+            keyword = _OPEN_DATE_KEYWORDS.get(open_date_input)
+            if keyword is not None:
+                open_date = keyword(now)
             else:
                 # Попытка парсинга ручного ввода
-                try:
-                    if ' ' in open_date_input:
-                        # Формат с временем
-                        open_date = datetime.strptime(open_date_input, '%d.%m.%Y %H:%M')
-                    else:
-                        # Только дата, время по умолчанию 09:00
-                        open_date = datetime.strptime(open_date_input, '%d.%m.%Y')
-                        open_date = open_date.replace(hour=9, minute=0)
-                    
-                    open_date = self.moscow_tz.localize(open_date)
-                except ValueError:
-                    raise ValueError("Неверный формат даты")
+                # Если время не указано, ставим 09:00
+                open_date = _parse_date_input(open_date_input, 9, 0)
                 
                 # Проверка, что дата открытия не в прошлом (с учетом текущего времени)
-                if open_date < datetime.now(self.moscow_tz):
+                if open_date < now:
                     await update.message.reply_text(
-                        "❌ **Дата открытия в прошлом**\n\n"
+                        "❌ <b>Дата открытия в прошлом</b>\n\n"
                         "Дата открытия должна быть в будущем или сейчас.\n"
-                        "Попробуйте еще раз:"
+                        "Попробуйте еще раз:",
+                        parse_mode='HTML'
                     )
                     return ADDING_TASK_OPEN_DATE
                     
         except ValueError as e:
             await update.message.reply_text(
-                "❌ **Неверный формат даты**\n\n"
+                "❌ <b>Неверный формат даты</b>\n\n"
                 "Используйте один из форматов:\n"
-                "• `ДД.ММ.ГГГГ ЧЧ:ММ` (например: 25.12.2024 09:00)\n"
-                "• `ДД.ММ.ГГГГ` (время установится 09:00)\n"
-                "• `сейчас` - открыть сейчас\n"
-                "• `завтра` - завтра в 09:00\n"
-                "• `неделя` - через неделю в 09:00"
+                "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> (например: 25.12.2024 09:00)\n"
+                "• <code>ДД.ММ.ГГГГ</code> (время установится 09:00)\n"
+                "• <code>сейчас</code> - открыть сейчас\n"
+                "• <code>завтра</code> - завтра в 09:00\n"
+                "• <code>неделя</code> - через неделю в 09:00",
+                parse_mode='HTML'
             )
             return ADDING_TASK_OPEN_DATE
         
-        context.user_data['adding_task']['open_date'] = open_date
+        draft = context.user_data['adding_task']
+        draft.open_date = open_date
+        # Если старый дедлайн не позже новой даты открытия, правка продолжается шагом дедлайна
+        if draft.from_preview and (draft.deadline is None or draft.deadline > open_date):
+            return await self._return_to_preview(update, draft)
         
         # Вычисляем предлагаемый дедлайн (через неделю после открытия)
         suggested_deadline = open_date + timedelta(days=7)
         suggested_deadline = suggested_deadline.replace(hour=23, minute=59, second=59)
         deadline_str = suggested_deadline.strftime('%d.%m.%Y %H:%M')
         
-        # Прогресс-бар
-        progress = "🟢🟢🟢🟢🔘"
-        
         await update.message.reply_text(
-            f"✅ **Дата открытия установлена!**\n"
-            f"📅 *{open_date.strftime('%d.%m.%Y в %H:%M МСК')}*\n\n"
-            f"📊 **Прогресс:** {progress} (4/5)\n\n"
-            f"⏰ **Шаг 5/5:** Установите дедлайн\n"
-            f"💡 *Предлагаемый дедлайн: {deadline_str}*\n\n"
-            f"📋 **Варианты ввода:**\n"
-            f"• Автоматический: `авто` или `auto`\n"
-            f"• Ручной ввод: `ДД.ММ.ГГГГ ЧЧ:ММ`\n"
-            f"• Завтра в 23:59: `завтра`\n"
-            f"• Через неделю: `неделя`\n"
-            f"• Без дедлайна: `нет`"
+            _STEP5_TEXT_TEMPLATE.format(
+                open=_fmt_long(open_date),
+                suggested=deadline_str
+            ),
+            parse_mode='HTML'
         )
         return ADDING_TASK_DEADLINE
 
+    @_requires_admin
     async def handle_add_task_deadline(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод дедлайна и создает задание"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-        
         deadline_str = update.message.text.strip().lower()
+        now = datetime.now(MOSCOW_TZ)
         
         try:
             # Обработка различных вариантов ввода дедлайна
             if deadline_str in ['авто', 'auto']:
                 # Автоматический дедлайн: через неделю после открытия
-                open_date = context.user_data['adding_task'].get('open_date', datetime.now(self.moscow_tz))
+                open_date = context.user_data['adding_task'].open_date or now
                 deadline = open_date + timedelta(days=7)
                 deadline = deadline.replace(hour=23, minute=59, second=59)
-            elif deadline_str in ['завтра', 'tomorrow']:
-                deadline = datetime.now(self.moscow_tz).replace(hour=23, minute=59, second=59) + timedelta(days=1)
-            elif deadline_str in ['неделя', 'week']:
-                deadline = datetime.now(self.moscow_tz) + timedelta(weeks=1)
-                deadline = deadline.replace(hour=23, minute=59, second=59)
-            elif deadline_str in ['нет', 'no', '-']:
-                deadline = None
+            elif deadline_str in _DEADLINE_KEYWORDS:
+                deadline = _DEADLINE_KEYWORDS[deadline_str](now)
             else:
                 # Попытка парсинга ручного ввода
-                try:
-                    deadline = datetime.strptime(deadline_str, '%d.%m.%Y %H:%M')
-                    deadline = self.moscow_tz.localize(deadline)
-                except ValueError:
-                    # Пробуем другие форматы
-                    try:
-                        deadline = datetime.strptime(deadline_str, '%d.%m.%Y')
-                        deadline = self.moscow_tz.localize(deadline.replace(hour=23, minute=59))
-                    except ValueError:
-                        raise ValueError("Неверный формат даты")
+                # Если время не указано, ставим 23:59
+                deadline = _parse_date_input(deadline_str, 23, 59)
                 
                 # Проверка, что дедлайн в будущем
-                if deadline and deadline <= datetime.now(self.moscow_tz):
+                if deadline and deadline <= now:
                     await update.message.reply_text(
-                        "❌ **Дедлайн в прошлом**\n\n"
+                        "❌ <b>Дедлайн в прошлом</b>\n\n"
                         "Дедлайн должен быть в будущем.\n"
-                        "Попробуйте еще раз:"
+                        "Попробуйте еще раз:",
+                        parse_mode='HTML'
                     )
                     return ADDING_TASK_DEADLINE
                 
                 # Проверка, что дедлайн не раньше даты открытия
-                open_date = context.user_data['adding_task'].get('open_date')
+                open_date = context.user_data['adding_task'].open_date
                 if deadline and open_date and deadline <= open_date:
                     await update.message.reply_text(
-                        "❌ **Дедлайн раньше даты открытия**\n\n"
+                        "❌ <b>Дедлайн раньше даты открытия</b>\n\n"
                         "Дедлайн должен быть позже даты открытия задания.\n"
-                        "Попробуйте еще раз:"
+                        "Попробуйте еще раз:",
+                        parse_mode='HTML'
                     )
                     return ADDING_TASK_DEADLINE
                     
         except ValueError as e:
             await update.message.reply_text(
-                "❌ **Неверный формат даты**\n\n"
+                "❌ <b>Неверный формат даты</b>\n\n"
                 "Используйте один из форматов:\n"
-                "• `ДД.ММ.ГГГГ ЧЧ:ММ` (например: 25.12.2024 23:59)\n"
-                "• `ДД.ММ.ГГГГ` (время установится 23:59)\n"
-                "• `авто` - автоматический расчет\n"
-                "• `завтра` - завтра в 23:59\n"
-                "• `неделя` - через неделю\n"
-                "• `нет` - без дедлайна"
+                "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> (например: 25.12.2024 23:59)\n"
+                "• <code>ДД.ММ.ГГГГ</code> (время установится 23:59)\n"
+                "• <code>авто</code> - автоматический расчет\n"
+                "• <code>завтра</code> - завтра в 23:59\n"
+                "• <code>неделя</code> - через неделю\n"
+                "• <code>нет</code> - без дедлайна",
+                parse_mode='HTML'
             )
             return ADDING_TASK_DEADLINE
         
@@ -1039,331 +1382,303 @@ class AdminBot:
         # Показываем предварительный просмотр
         preview_text = self._generate_task_preview(task_data, deadline)
         
-        keyboard = [
-            [InlineKeyboardButton("✅ Создать задание", callback_data="confirm_create_task")],
-            [InlineKeyboardButton("✏️ Изменить", callback_data="edit_task_preview")],
-            [InlineKeyboardButton("❌ Отменить", callback_data="tasks_menu")]
-        ]
-        
         # Сохраняем дедлайн для подтверждения
-        context.user_data['adding_task']['deadline'] = deadline
+        task_data.deadline = deadline
+        task_data.from_preview = False
         
         await update.message.reply_text(
             preview_text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode='HTML',
+            reply_markup=_PREVIEW_MARKUP
         )
         
-        return ADDING_TASK_DEADLINE
+        # Дальше черновик подтверждается и правится кнопками через handle_callback
+        return ConversationHandler.END
 
-    def _generate_task_preview(self, task_data: dict, deadline: datetime) -> str:
+    async def _return_to_preview(self, update: Update, draft: TaskDraft):
+        """Показывает предпросмотр после правки поля и завершает диалог"""
+        draft.from_preview = False
+        await update.message.reply_text(
+            self._generate_task_preview(draft, draft.deadline),
+            parse_mode='HTML',
+            reply_markup=_PREVIEW_MARKUP
+        )
+        return ConversationHandler.END
+
+    def _generate_task_preview(self, task_data: TaskDraft, deadline: datetime) -> str:
         """Генерирует предварительный просмотр задания"""
         progress = "🟢🟢🟢🟢🟢"
         
-        open_date = task_data.get('open_date', datetime.now(self.moscow_tz))
-        is_open = open_date <= datetime.now(self.moscow_tz)
+        now = datetime.now(MOSCOW_TZ)
+        open_date = task_data.open_date or now
+        is_open = open_date <= now
         
-        preview = (
-            f"📋 **ПРЕДВАРИТЕЛЬНЫЙ ПРОСМОТР ЗАДАНИЯ**\n\n"
-            f"📊 **Прогресс:** {progress} (5/5) ✅\n\n"
-            f"📝 **Название:**\n{task_data['title']}\n\n"
-            f"📄 **Описание:**\n{task_data['description']}\n\n"
-            f"🔗 **Ссылка:**\n{task_data['link'] or 'не указана'}\n\n"
-            f"📅 **Открытие:**\n{open_date.strftime('%d.%m.%Y в %H:%M МСК')}\n\n"
-            f"⏰ **Дедлайн:**\n{deadline.strftime('%d.%m.%Y в %H:%M МСК') if deadline else 'не установлен'}\n\n"
-            f"🟢 **Статус:** {'Открыто' if is_open else 'Ожидает открытия'}\n\n"
-            f"🎯 **Готово к созданию!**\n"
-            f"Проверьте данные и нажмите кнопку для создания задания."
-        )
+        parts = [
+            "📋 <b>ПРЕДВАРИТЕЛЬНЫЙ ПРОСМОТР ЗАДАНИЯ</b>",
+            f"📊 <b>Прогресс:</b> {progress} (5/5) ✅",
+            f"📝 <b>Название:</b>\n{html.escape(task_data.title)}",
+            f"📄 <b>Описание:</b>\n{html.escape(task_data.description)}",
+        ]
+        # Строку ссылки показываем только если ссылка задана
+        if task_data.link:
+            parts.append(f"🔗 <b>Ссылка:</b>\n{html.escape(task_data.link)}")
+        parts.append(f"📅 <b>Открытие:</b>\n{_fmt_long(open_date)}")
+        parts.append(f"⏰ <b>Дедлайн:</b>\n{_fmt_long(deadline) if deadline else 'не установлен'}")
+        parts.append(f"🟢 <b>Статус:</b> {'Открыто' if is_open else 'Ожидает открытия'}")
+        parts.append("🎯 <b>Готово к созданию!</b>\nПроверьте данные и нажмите кнопку для создания задания.")
         
-        return preview
+        return "\n\n".join(parts)
 
 
 
     def _validate_url(self, url: str) -> bool:
         """Валидирует URL"""
-        if not url:
-            return False
-        
-        # Проверка на Telegram каналы/боты
-        if url.startswith('@'):
-            return len(url) > 1
-        
-        # Проверка на HTTP/HTTPS
-        if url.startswith(('http://', 'https://')):
-            return True
-        
-        # Проверка на t.me ссылки
-        if url.startswith('t.me/'):
-            return True
-        
-        return False
+        # @канал (непустой), http(s):// или t.me/
+        return bool(url) and _URL_RE.match(url) is not None
 
-    def _check_task_title_exists(self, title: str) -> bool:
+    async def _check_task_title_exists(self, title: str) -> bool:
         """Проверяет, существует ли задание с таким названием"""
-        try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id FROM tasks WHERE title = ?', (title,))
-                return cursor.fetchone() is not None
-        except Exception:
-            return False
+        if self._titles_cache is None:
+            try:
+                # Названия загружаются из пула чтения в рабочем потоке
+                titles, = await self._fetch_rows(('SELECT title FROM tasks', ()))
+                self._titles_cache = {row[0] for row in titles}
+            except Exception:
+                return False
+        return title in self._titles_cache
 
     async def _apply_task_template(self, update: Update, context: ContextTypes.DEFAULT_TYPE, template_type: str):
         """Применяет шаблон задания"""
-        templates = {
-            'observation': {
-                'title': 'Экологическое наблюдение',
-                'description': 'Проведите наблюдение за природой в вашем районе. Сфотографируйте интересные природные объекты и поделитесь своими наблюдениями.',
-                'link': None
-            },
-            'action': {
-                'title': 'Экологическое действие',
-                'description': 'Совершите одно полезное действие для окружающей среды. Это может быть уборка территории, посадка растений или сортировка отходов.',
-                'link': None
-            },
-            'research': {
-                'title': 'Исследование природы',
-                'description': 'Проведите небольшое исследование природного объекта в вашем районе. Изучите его особенности и поделитесь результатами.',
-                'link': None
-            }
-        }
-        
-        template = templates.get(template_type)
+        template = _TEMPLATES.get(template_type)
         if not template:
             await update.message.reply_text("❌ Неизвестный шаблон!")
             return ADDING_TASK_TITLE
         
         # Применяем шаблон
-        current_date = datetime.now(self.moscow_tz)
-        template['title'] = f"{template['title']} - {current_date.strftime('%d.%m.%Y')}"
-        
-        context.user_data['adding_task'] = template.copy()
-        context.user_data['adding_task']['open_date'] = current_date
-        
-        # Автоматически устанавливаем дедлайн (через неделю)
-        deadline = current_date + timedelta(days=7)
-        deadline = deadline.replace(hour=23, minute=59, second=59)
-        context.user_data['adding_task']['deadline'] = deadline
+        draft = _draft_from_template(template, datetime.now(MOSCOW_TZ))
+        context.user_data['adding_task'] = draft
         
         # Показываем предварительный просмотр
-        preview_text = self._generate_task_preview(context.user_data['adding_task'], deadline)
-        
-        keyboard = [
-            [InlineKeyboardButton("✅ Создать задание", callback_data="confirm_create_task")],
-            [InlineKeyboardButton("✏️ Изменить", callback_data="edit_task_preview")],
-            [InlineKeyboardButton("❌ Отменить", callback_data="tasks_menu")]
-        ]
+        preview_text = self._generate_task_preview(draft, draft.deadline)
         
         await update.message.reply_text(
-            f"🎯 **Шаблон '{template_type}' применен!**\n\n{preview_text}",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            f"🎯 <b>Шаблон '{template_type}' применен!</b>\n\n{preview_text}",
+            parse_mode='HTML',
+            reply_markup=_PREVIEW_MARKUP
         )
         
-        return ADDING_TASK_DEADLINE
+        # Как и после шага дедлайна, дальше работают только кнопки предпросмотра
+        return ConversationHandler.END
 
-    async def _show_tasks_list(self, query):
-        """Показывает список всех заданий"""
-        tasks = self.db.get_all_tasks()
+    async def _show_tasks_list(self, query, after: Optional[int] = None):
+        """Показывает список всех заданий
+        
+        Страницы листаются по id последнего показанного задания (after);
+        снимок заданий отсортирован по id, поэтому начало страницы ищется бинпоиском.
+        """
+        tasks = await self._get_tasks_snapshot()
         
         if not tasks:
-            text = "📝 **Список заданий пуст**\n\nДобавьте первое задание!"
-            keyboard = [
-                [InlineKeyboardButton("➕ Добавить задание", callback_data="add_task")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
-            ]
+            text = "📝 <b>Список заданий пуст</b>\n\nДобавьте первое задание!"
+            reply_markup = _EMPTY_TASKS_LIST_MARKUP
         else:
-            text = f"📝 **Список заданий** (всего: {len(tasks)})\n\n"
+            text = f"📝 <b>Список заданий</b> (всего: {len(tasks)})\n\n"
+            
+            start = bisect_right(tasks, after, key=lambda task: task[0]) if after else 0
+            page = tasks[start:start + TASKS_PAGE_SIZE]
             
             keyboard = []
-            for task_id, title, description, link, is_open in tasks:
+            for task_id, title, description, link, is_open, submissions_count in page:
                 status_emoji = "🟢" if is_open else "📁"
                 short_title = title[:30] + "..." if len(title) > 30 else title
                 
                 keyboard.append([InlineKeyboardButton(
-                    f"{status_emoji} {short_title}",
+                    f"{status_emoji} {short_title} · 📤 {submissions_count}",
                     callback_data=f"task_{task_id}"
                 )])
             
-            keyboard.append([InlineKeyboardButton("➕ Добавить задание", callback_data="add_task")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            if start + TASKS_PAGE_SIZE < len(tasks):
+                keyboard.append([InlineKeyboardButton(
+                    "📄 Показать еще",
+                    callback_data=f"list_tasks_after_{page[-1][0]}"
+                )])
+            
+            keyboard.extend(_TASKS_LIST_TAIL)
+            reply_markup = InlineKeyboardMarkup(keyboard)
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode='HTML',
+            reply_markup=reply_markup
         )
 
     async def _handle_task_action(self, query, context, data):
         """Обрабатывает действия с заданием"""
-        task_id = int(data.split('_')[1])
+        task_id = int(data.removeprefix('task_'))
         
         # Получаем информацию о задании
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, title, description, link, is_open, week_number, deadline, open_date
-                FROM tasks WHERE id = ?
-            ''', (task_id,))
-            task = cursor.fetchone()
-            
-            # Получаем количество отчетов по этому заданию
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE task_id = ?', (task_id,))
-            submissions_count = cursor.fetchone()[0]
+        task = await self._fetch_one('''
+            SELECT title, description, link, is_open, week_number, deadline, open_date,
+                   submissions_count
+            FROM tasks WHERE id = ?
+        ''', (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
             return
         
-        task_id, title, description, link, is_open, week_number, deadline, open_date = task
-        
-        status = "🟢 Открыто" if is_open else "📁 Архив"
+        status = "🟢 Открыто" if task['is_open'] else "📁 Архив"
         deadline_str = "не установлен"
-        if deadline:
-            deadline_dt = datetime.fromisoformat(deadline)
-            deadline_str = deadline_dt.strftime('%d.%m.%Y в %H:%M МСК')
+        if task['deadline']:
+            deadline_dt = datetime.fromisoformat(task['deadline'])
+            deadline_str = _fmt_long(deadline_dt)
         
         open_date_str = "не установлена"
-        if open_date:
-            open_date_dt = datetime.fromisoformat(open_date)
-            open_date_str = open_date_dt.strftime('%d.%m.%Y в %H:%M МСК')
+        if task['open_date']:
+            open_date_dt = datetime.fromisoformat(task['open_date'])
+            open_date_str = _fmt_long(open_date_dt)
         
         text = (
-            f"📋 **Информация о задании**\n\n"
-            f"🆔 **ID:** {task_id}\n"
-            f"📝 **Название:** {title}\n"
-            f"📄 **Описание:** {description or 'не указано'}\n"
-            f"🔗 **Ссылка:** {link or 'не указана'}\n"
-            f"📅 **Дата открытия:** {open_date_str}\n"
-            f"📅 **Неделя:** {week_number or 'не указана'} *(устаревшее поле)*\n"
-            f"⏰ **Дедлайн:** {deadline_str}\n"
-            f"📊 **Статус:** {status}\n"
-            f"📤 **Отчетов получено:** {submissions_count}"
+            f"📋 <b>Информация о задании</b>\n\n"
+            f"🆔 <b>ID:</b> {task_id}\n"
+            f"📝 <b>Название:</b> {html.escape(task['title'])}\n"
+            f"📄 <b>Описание:</b> {html.escape(task['description'] or 'не указано')}\n"
+            f"🔗 <b>Ссылка:</b> {html.escape(task['link'] or 'не указана')}\n"
+            f"📅 <b>Дата открытия:</b> {open_date_str}\n"
+            f"📅 <b>Неделя:</b> {task['week_number'] or 'не указана'} <i>(устаревшее поле)</i>\n"
+            f"⏰ <b>Дедлайн:</b> {deadline_str}\n"
+            f"📊 <b>Статус:</b> {status}\n"
+            f"📤 <b>Отчетов получено:</b> {task['submissions_count']}"
         )
         
-        # Экранируем текст для MarkdownV2
-        safe_text = escape_markdown(text, version=2)
-        
         keyboard = [
             [InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_task_{task_id}")],
             [InlineKeyboardButton("📤 Отчеты по заданию", callback_data=f"task_reports_{task_id}")],
             [InlineKeyboardButton("🔄 Изменить статус", callback_data=f"toggle_task_{task_id}")],
             [InlineKeyboardButton("🗑️ Удалить", callback_data=f"delete_task_{task_id}")],
-            [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            *_TASK_CARD_TAIL
         ]
         
         await query.edit_message_text(
-            safe_text,
-            parse_mode='MarkdownV2',
+            text,
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-    async def _show_pending_reports(self, query):
-        """Показывает отчеты, ожидающие проверки"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT s.id, s.user_id, s.submission_date, s.submission_type, s.content, 
-                       s.file_id, s.is_on_time, t.title, u.first_name, u.last_name
-                FROM submissions s
-                JOIN tasks t ON s.task_id = t.id
-                LEFT JOIN users u ON s.user_id = u.user_id
-                WHERE s.status = 'pending'
-                ORDER BY s.submission_date ASC
-                LIMIT 10
-            ''')
-            reports = cursor.fetchall()
+    async def _show_pending_reports(self, query, after: Optional[str] = None):
+        """Показывает отчеты, ожидающие проверки
+        
+        Страницы листаются по ключу (дата отправки, id) последнего показанного
+        отчета, переданному в after как "<дата>_<id>", без OFFSET.
+        """
+        if after:
+            after_date, _, after_id = after.rpartition('_')
+            keyset = "AND (s.submission_date, s.id) > (?, ?)"
+            params = (after_date, int(after_id), PENDING_PAGE_SIZE + 1)
+        else:
+            keyset = ""
+            params = (PENDING_PAGE_SIZE + 1,)
+        
+        reports, = await self._fetch_rows((f'''
+            SELECT s.id, s.user_id, s.submission_date, s.submission_type,
+                   s.is_on_time, u.first_name, u.last_name,
+                   {sql_date_short('s.submission_date')} AS short_date
+            FROM submissions s
+            JOIN tasks t ON s.task_id = t.id
+            LEFT JOIN users u ON s.user_id = u.user_id
+            WHERE s.status = 'pending' {keyset}
+            ORDER BY s.submission_date ASC, s.id ASC
+            LIMIT ?
+        ''', params))
+        
+        # Лишняя строка означает, что есть следующая страница
+        has_next = len(reports) > PENDING_PAGE_SIZE
+        reports = reports[:PENDING_PAGE_SIZE]
         
         if not reports:
-            text = "✅ **Нет отчетов, ожидающих проверки**"
-            keyboard = [
-                [InlineKeyboardButton("🔄 Обновить", callback_data="pending_reports")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
-            ]
+            text = "✅ <b>Нет отчетов, ожидающих проверки</b>"
+            reply_markup = _EMPTY_PENDING_MARKUP
         else:
-            text = f"⏳ **Отчеты, ожидающие проверки** (показано: {len(reports)})\n\n"
+            text = f"⏳ <b>Отчеты, ожидающие проверки</b> (показано: {len(reports)})\n\n"
             
             keyboard = []
             for report in reports:
-                submission_id, user_id, date, sub_type, content, file_id, is_on_time, task_title, first_name, last_name = report
-                
-                # Форматируем дату
-                date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime("%d.%m %H:%M")
+                formatted_date = report['short_date']
                 
                 # Имя пользователя
-                user_name = f"{first_name or ''} {last_name or ''}".strip() or f"ID{user_id}"
+                user_name = _format_user(report['first_name'], report['last_name'], report['user_id'])[:REPORT_BUTTON_NAME_LEN]
                 
                 # Статус времени
-                time_status = "⏰" if not is_on_time else "✅"
+                time_status = "⏰" if not report['is_on_time'] else "✅"
                 
                 # Тип отчета
-                type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(sub_type, "📝")
+                type_emoji = _TYPE_EMOJI.get(report['submission_type'], "📝")
                 
                 button_text = f"{type_emoji}{time_status} {user_name} • {formatted_date}"
                 keyboard.append([InlineKeyboardButton(
-                    button_text[:50],
-                    callback_data=f"report_{submission_id}"
+                    button_text,
+                    callback_data=f"report_{report['id']}"
                 )])
             
-            keyboard.append([InlineKeyboardButton("🔄 Обновить", callback_data="pending_reports")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            if has_next:
+                last = reports[-1]
+                keyboard.append([InlineKeyboardButton(
+                    "Далее »",
+                    callback_data=f"pending_after_{last['submission_date']}_{last['id']}"
+                )])
+            keyboard.extend(_PENDING_TAIL)
+            reply_markup = InlineKeyboardMarkup(keyboard)
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            parse_mode='HTML',
+            reply_markup=reply_markup
         )
 
     async def _handle_report_action(self, query, context, data):
         """Обрабатывает действия с отчетом"""
-        submission_id = int(data.split('_')[1])
+        submission_id = int(data.removeprefix('report_'))
         
         # Получаем подробную информацию об отчете
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT s.id, s.user_id, s.task_id, s.submission_date, s.submission_type, 
-                       s.content, s.file_id, s.status, s.is_on_time,
-                       t.title, t.description,
-                       u.first_name, u.last_name, u.username
-                FROM submissions s
-                JOIN tasks t ON s.task_id = t.id
-                LEFT JOIN users u ON s.user_id = u.user_id
-                WHERE s.id = ?
-            ''', (submission_id,))
-            report = cursor.fetchone()
+        report = await self._fetch_one('''
+            SELECT s.id, s.user_id, s.task_id, s.submission_date, s.submission_type, 
+                   s.content, s.file_id, s.status, s.is_on_time,
+                   t.title, u.first_name, u.last_name, u.username
+            FROM submissions s
+            JOIN tasks t ON s.task_id = t.id
+            LEFT JOIN users u ON s.user_id = u.user_id
+            WHERE s.id = ?
+        ''', (submission_id,))
         
         if not report:
             await query.edit_message_text("❌ Отчет не найден.")
             return
         
-        (sub_id, user_id, task_id, date, sub_type, content, file_id, status, 
-         is_on_time, task_title, task_desc, first_name, last_name, username) = report
+        sub_id = report['id']
+        user_id = report['user_id']
+        status = report['status']
+        content = report['content']
         
         # Форматируем информацию
-        date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
-        formatted_date = date_obj.strftime("%d.%m.%Y в %H:%M МСК")
+        date_obj = _parse_iso(report['submission_date'])
+        formatted_date = _fmt_long(date_obj)
         
-        user_name = f"{first_name or ''} {last_name or ''}".strip() or f"ID{user_id}"
-        if username:
-            user_name += f" (@{username})"
+        user_name = _format_user(report['first_name'], report['last_name'], user_id, report['username'])
         
-        time_status = "⏰ С опозданием" if not is_on_time else "✅ В срок"
-        status_text = {"pending": "⏳ Ожидает проверки", "approved": "✅ Одобрен", "rejected": "❌ Отклонен"}.get(status, status)
-        type_text = {"text": "📝 Текст", "photo": "📸 Фото", "video": "🎥 Видео", "document": "📄 Документ"}.get(sub_type, sub_type)
+        time_status = "⏰ С опозданием" if not report['is_on_time'] else "✅ В срок"
+        status_text = _STATUS_TEXT.get(status, status)
+        sub_type = report['submission_type']
+        type_text = _TYPE_TEXT.get(sub_type, sub_type)
         
         text = (
-            f"📤 **Отчет #{sub_id}**\n\n"
-            f"👤 **Пользователь:** {user_name}\n"
-            f"📋 **Задание:** {task_title}\n"
-            f"📅 **Дата отправки:** {formatted_date}\n"
-            f"📝 **Тип:** {type_text}\n"
-            f"⏰ **Статус времени:** {time_status}\n"
-            f"📊 **Статус проверки:** {status_text}\n\n"
-            f"💬 **Содержимое:**\n{content[:500]}{'...' if len(content) > 500 else ''}"
+            f"📤 <b>Отчет #{sub_id}</b>\n\n"
+            f"👤 <b>Пользователь:</b> {html.escape(user_name)}\n"
+            f"📋 <b>Задание:</b> {html.escape(report['title'])}\n"
+            f"📅 <b>Дата отправки:</b> {formatted_date}\n"
+            f"📝 <b>Тип:</b> {type_text}\n"
+            f"⏰ <b>Статус времени:</b> {time_status}\n"
+            f"📊 <b>Статус проверки:</b> {status_text}\n\n"
+            f"💬 <b>Содержимое:</b>\n{html.escape(content[:500])}{'...' if len(content) > 500 else ''}"
         )
         
         keyboard = []
@@ -1374,177 +1689,206 @@ class AdminBot:
                 [InlineKeyboardButton("❌ Отклонить", callback_data=f"reject_{sub_id}")]
             ])
         
-        if file_id:
+        if report['file_id']:
             keyboard.append([InlineKeyboardButton("📎 Показать файл", callback_data=f"show_file_{sub_id}")])
         
         keyboard.extend([
             [InlineKeyboardButton("👤 Профиль пользователя", callback_data=f"user_profile_{user_id}")],
-            [InlineKeyboardButton("📋 Задание", callback_data=f"task_{task_id}")],
+            [InlineKeyboardButton("📋 Задание", callback_data=f"task_{report['task_id']}")],
             [InlineKeyboardButton("⏳ Ожидающие", callback_data="pending_reports")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ])
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+
+    async def _show_report_decision(self, query, submission_id: int, status: str):
+        """Обновляет уже показанную карточку отчета после решения без запроса к БД
+        
+        Меняется только строка статуса проверки, кнопки одобрения и отклонения
+        убираются. Если карточки под рукой нет, она перерисовывается целиком.
+        """
+        message = query.message
+        text = message.text_html if message and message.reply_markup else None
+        if not text or not _REPORT_STATUS_RE.search(text):
+            await self._handle_report_action(query, None, f"report_{submission_id}")
+            return
+        
+        text = _REPORT_STATUS_RE.sub(lambda m: m.group(1) + _STATUS_TEXT[status], text, count=1)
+        decided = (f"approve_{submission_id}", f"reject_{submission_id}")
+        keyboard = [
+            row for row in message.reply_markup.inline_keyboard
+            if row[0].callback_data not in decided
+        ]
+        await query.edit_message_text(
+            text,
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _approve_report(self, query, data):
         """Одобряет отчет"""
-        submission_id = int(data.split('_')[1])
+        submission_id = int(data.removeprefix('approve_'))
         
-        # Обновляем статус в базе данных
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE submissions SET status = 'approved' WHERE id = ?
-            ''', (submission_id,))
-            conn.commit()
+        try:
+            # Ответ и карточка - только после коммита записи
+            await self._write(
+                "UPDATE submissions SET status = 'approved' WHERE id = ?", (submission_id,)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при смене статуса отчета {submission_id}: {e}")
+            await query.answer("❌ Ошибка при сохранении статуса!")
+            return
         
         await query.answer("✅ Отчет одобрен!")
-        
-        # Обновляем сообщение
-        await self._handle_report_action(query, None, f"report_{submission_id}")
+        await self._show_report_decision(query, submission_id, 'approved')
 
     async def _reject_report(self, query, data):
         """Отклоняет отчет"""
-        submission_id = int(data.split('_')[1])
+        submission_id = int(data.removeprefix('reject_'))
         
-        # Обновляем статус в базе данных
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE submissions SET status = 'rejected' WHERE id = ?
-            ''', (submission_id,))
-            conn.commit()
+        try:
+            # Ответ и карточка - только после коммита записи
+            await self._write(
+                "UPDATE submissions SET status = 'rejected' WHERE id = ?", (submission_id,)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при смене статуса отчета {submission_id}: {e}")
+            await query.answer("❌ Ошибка при сохранении статуса!")
+            return
         
         await query.answer("❌ Отчет отклонен!")
-        
-        # Обновляем сообщение
-        await self._handle_report_action(query, None, f"report_{submission_id}")
+        await self._show_report_decision(query, submission_id, 'rejected')
 
-    async def _show_potential_reports(self, query):
-        """Показывает потенциальные отчеты для ручной обработки"""
-        reports = self.db.get_potential_reports()
+    async def _show_potential_reports(self, query, limit: int = POTENTIAL_PAGE_SIZE):
+        """Показывает потенциальные отчеты для ручной обработки
         
-        if not reports:
-            text = "✅ **Нет необработанных потенциальных отчетов**"
+        По умолчанию первые POTENTIAL_PAGE_SIZE; кнопка "и еще N" открывает
+        до POTENTIAL_ALL_LIMIT отчетов.
+        """
+        total, reports = await asyncio.to_thread(self.db.get_potential_reports_page, limit)
+        
+        if not total:
+            text = "✅ <b>Нет необработанных потенциальных отчетов</b>"
             keyboard = [
-                [InlineKeyboardButton("🔄 Обновить", callback_data="potential_reports")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_REFRESH_POTENTIAL],
+                [_BTN_MAIN_MENU]
             ]
         else:
-            text = f"🔍 **Потенциальные отчеты** (найдено: {len(reports)})\n\n"
-            text += "Это сообщения пользователей, которые могут быть отчетами, но были отправлены вне контекста задания.\n\n"
+            text = (
+                f"🔍 <b>Потенциальные отчеты</b> (найдено: {total})\n\n"
+                "Это сообщения пользователей, которые могут быть отчетами, но были отправлены вне контекста задания.\n\n"
+            )
             
             keyboard = []
-            for report_id, user_id, message_data, message_type, received_date in reports[:10]:
-                try:
-                    data = json.loads(message_data)
-                    content = data.get('content', 'Нет содержимого')
-                    msg_type = data.get('type', 'text')
-                    
-                    # Форматируем дату
-                    date_obj = datetime.fromisoformat(received_date.replace('Z', '+00:00'))
-                    formatted_date = date_obj.strftime("%d.%m.%Y в %H:%M МСК")
-                    
-                    type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(msg_type, "📝")
-                    button_text = f"{type_emoji} ID{user_id} • {formatted_date}"
-                    
-                    keyboard.append([InlineKeyboardButton(
-                        button_text,
-                        callback_data=f"potential_{report_id}"
-                    )])
-                    
-                except json.JSONDecodeError:
-                    continue
+            for report_id, user_id, msg_type, formatted_date in reports:
+                type_emoji = _TYPE_EMOJI.get(msg_type, "📝")
+                button_text = f"{type_emoji} ID{user_id} • {formatted_date}"
+                
+                keyboard.append([InlineKeyboardButton(
+                    button_text,
+                    callback_data=f"potential_{report_id}"
+                )])
             
-            if len(reports) > 10:
-                keyboard.append([InlineKeyboardButton(f"... и еще {len(reports) - 10}", callback_data="potential_reports_all")])
+            if total > len(reports) and limit < POTENTIAL_ALL_LIMIT:
+                keyboard.append([InlineKeyboardButton(f"... и еще {total - len(reports)}", callback_data="potential_reports_all")])
             
-            keyboard.append([InlineKeyboardButton("🔄 Обновить", callback_data="potential_reports")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            keyboard.append([_BTN_REFRESH_POTENTIAL])
+            keyboard.append([_BTN_MAIN_MENU])
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-    async def _show_all_reports(self, query):
-        """Показывает все отчеты с пагинацией"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT s.id, s.user_id, s.submission_date, s.submission_type, s.status, 
-                       s.is_on_time, t.title, u.first_name, u.last_name
+    async def _show_all_reports(self, query, before: Optional[str] = None):
+        """Показывает все отчеты с пагинацией
+        
+        Страницы листаются от новых к старым по ключу (дата отправки, id)
+        последнего показанного отчета, переданному в before как "<дата>_<id>".
+        """
+        if before:
+            before_date, _, before_id = before.rpartition('_')
+            keyset = "WHERE (s.submission_date, s.id) < (?, ?)"
+            params = (before_date, int(before_id), ALL_REPORTS_PAGE_SIZE + 1)
+        else:
+            keyset = ""
+            params = (ALL_REPORTS_PAGE_SIZE + 1,)
+        
+        reports, totals = await self._fetch_rows(
+            (f'''
+                SELECT s.id, s.submission_date, s.submission_type, s.status, 
+                       s.is_on_time, t.title, {_SQL_USER_NAME},
+                       {sql_date_short('s.submission_date')} AS short_date
                 FROM submissions s
                 JOIN tasks t ON s.task_id = t.id
                 LEFT JOIN users u ON s.user_id = u.user_id
-                ORDER BY s.submission_date DESC
-                LIMIT 15
-            ''')
-            reports = cursor.fetchall()
-            
-            # Общее количество
-            cursor.execute('SELECT COUNT(*) FROM submissions')
-            total_count = cursor.fetchone()[0]
+                {keyset}
+                ORDER BY s.submission_date DESC, s.id DESC
+                LIMIT ?
+            ''', params),
+            # Общее количество из счетчиков заданий: без прохода по submissions
+            ('SELECT COALESCE(SUM(submissions_count), 0) FROM tasks', ()),
+        )
+        total_count = totals[0][0]
+        
+        # Лишняя строка означает, что есть следующая страница
+        has_next = len(reports) > ALL_REPORTS_PAGE_SIZE
+        reports = reports[:ALL_REPORTS_PAGE_SIZE]
         
         if not reports:
-            text = "📤 **Нет отчетов в системе**"
+            text = "📤 <b>Нет отчетов в системе</b>"
             keyboard = [
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
         else:
-            text = f"📤 **Все отчеты** (показано: {len(reports)} из {total_count})\n\n"
+            text = f"📤 <b>Все отчеты</b> (показано: {len(reports)} из {total_count})\n\n"
             
             keyboard = []
             for report in reports:
-                submission_id, user_id, date, sub_type, status, is_on_time, task_title, first_name, last_name = report
-                
-                # Форматируем дату
-                date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime("%d.%m %H:%M")
-                
-                # Имя пользователя
-                user_name = f"{first_name or ''} {last_name or ''}".strip() or f"ID{user_id}"
+                submission_id, date, sub_type, status, is_on_time, task_title, user_name, formatted_date = report
+                user_name = user_name[:REPORT_BUTTON_NAME_LEN]
                 
                 # Статус
-                status_emoji = {"pending": "⏳", "approved": "✅", "rejected": "❌"}.get(status, "❓")
+                status_emoji = _STATUS_EMOJI.get(status, "❓")
                 time_emoji = "⏰" if not is_on_time else "✅"
-                type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(sub_type, "📝")
+                type_emoji = _TYPE_EMOJI.get(sub_type, "📝")
                 
                 button_text = f"{type_emoji}{status_emoji}{time_emoji} {user_name} • {formatted_date}"
                 keyboard.append([InlineKeyboardButton(
-                    button_text[:50],
+                    button_text,
                     callback_data=f"report_{submission_id}"
                 )])
             
-            if total_count > 15:
-                keyboard.append([InlineKeyboardButton("📄 Показать еще", callback_data="all_reports_next")])
+            if has_next:
+                last = reports[-1]
+                keyboard.append([InlineKeyboardButton(
+                    "📄 Показать еще",
+                    callback_data=f"all_reports_before_{last['submission_date']}_{last['id']}"
+                )])
             
-            keyboard.append([InlineKeyboardButton("📤 Отчеты", callback_data="reports_menu")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            keyboard.append([_BTN_REPORTS_MENU])
+            keyboard.append([_BTN_MAIN_MENU])
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _start_edit_task(self, query, context, data):
         """Начинает редактирование задания"""
-        task_id = int(data.split('_')[2])  # edit_task_123
+        task_id = int(data.removeprefix('edit_task_'))  # edit_task_123
         
         # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, title, description, link, is_open, week_number, deadline, open_date
-                FROM tasks WHERE id = ?
-            ''', (task_id,))
-            task = cursor.fetchone()
+        task = await self._fetch_one('''
+            SELECT id, title, description, link, is_open, week_number, deadline, open_date
+            FROM tasks WHERE id = ?
+        ''', (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
@@ -1556,22 +1900,22 @@ class AdminBot:
         deadline_str = "не установлен"
         if deadline:
             deadline_dt = datetime.fromisoformat(deadline)
-            deadline_str = deadline_dt.strftime('%d.%m.%Y в %H:%M МСК')
+            deadline_str = _fmt_long(deadline_dt)
         
         open_date_str = "не установлена"
         if open_date:
             open_date_dt = datetime.fromisoformat(open_date)
-            open_date_str = open_date_dt.strftime('%d.%m.%Y в %H:%M МСК')
+            open_date_str = _fmt_long(open_date_dt)
         
         text = (
-            f"✏️ **Редактирование задания #{task_id}**\n\n"
-            f"📝 **Название:** {title}\n"
-            f"📄 **Описание:** {description or 'не указано'}\n"
-            f"🔗 **Ссылка:** {link or 'не указана'}\n"
-            f"📅 **Дата открытия:** {open_date_str}\n"
-            f"📅 **Неделя:** {week_number or 'не указана'} *(устаревшее поле)*\n"
-            f"⏰ **Дедлайн:** {deadline_str}\n"
-            f"📊 **Статус:** {status}\n\n"
+            f"✏️ <b>Редактирование задания #{task_id}</b>\n\n"
+            f"📝 <b>Название:</b> {html.escape(title)}\n"
+            f"📄 <b>Описание:</b> {html.escape(description or 'не указано')}\n"
+            f"🔗 <b>Ссылка:</b> {html.escape(link or 'не указана')}\n"
+            f"📅 <b>Дата открытия:</b> {open_date_str}\n"
+            f"📅 <b>Неделя:</b> {week_number or 'не указана'} <i>(устаревшее поле)</i>\n"
+            f"⏰ <b>Дедлайн:</b> {deadline_str}\n"
+            f"📊 <b>Статус:</b> {status}\n\n"
             f"Что хотите изменить?"
         )
         
@@ -1583,20 +1927,17 @@ class AdminBot:
             [InlineKeyboardButton("⏰ Дедлайн", callback_data=f"edit_deadline_{task_id}")],
             [InlineKeyboardButton(f"📊 Статус ({status})", callback_data=f"toggle_task_{task_id}")],
             [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ]
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def handle_edit_title(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод нового названия задания"""
-        if not await self._check_admin_access(update):
-            return
-        
         new_title = update.message.text.strip()
         if len(new_title) < 5:
             await update.message.reply_text(
@@ -1608,31 +1949,30 @@ class AdminBot:
         task_id = context.user_data.get('editing_task_id')
         if not task_id:
             await update.message.reply_text("❌ Ошибка: ID задания не найден.")
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             return
         
         # Обновляем название в базе данных
         try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('UPDATE tasks SET title = ? WHERE id = ?', (new_title, task_id))
-                conn.commit()
+            # _write сам сбрасывает кэш меню после коммита
+            await self._write('UPDATE tasks SET title = ? WHERE id = ?', (new_title, task_id))
+            self._titles_cache = None
             
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
             await update.message.reply_text(
-                f"✅ **Название задания успешно изменено!**\n\n"
-                f"📝 **Новое название:** {new_title}",
-                parse_mode='Markdown',
+                f"✅ <b>Название задания успешно изменено!</b>\n\n"
+                f"📝 <b>Новое название:</b> {html.escape(new_title)}",
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
             # Очищаем данные
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             
         except Exception as e:
             logger.error(f"Ошибка при изменении названия задания: {e}")
@@ -1646,16 +1986,13 @@ class AdminBot:
         await query.answer()
         
         data = query.data
-        task_id = int(data.split('_')[2])  # edit_desc_123
+        task_id = int(data.removeprefix('edit_desc_'))  # edit_desc_123
         
         # Сохраняем ID задания в контекст
         context.user_data['editing_task_id'] = task_id
         
         # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT description FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
+        task = await self._fetch_one('SELECT description FROM tasks WHERE id = ?', (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
@@ -1664,10 +2001,10 @@ class AdminBot:
         current_description = task[0] or "не указано"
         
         text = (
-            f"✏️ **Редактирование описания задания #{task_id}**\n\n"
-            f"📄 **Текущее описание:** {current_description}\n\n"
+            f"✏️ <b>Редактирование описания задания #{task_id}</b>\n\n"
+            f"📄 <b>Текущее описание:</b> {html.escape(current_description)}\n\n"
             "Введите новое описание задания:\n\n"
-            "💡 _Для отмены введите_ `/cancel`"
+            "💡 <i>Для отмены введите</i> <code>/cancel</code>"
         )
         
         keyboard = [
@@ -1676,7 +2013,7 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
@@ -1685,39 +2022,35 @@ class AdminBot:
 
     async def handle_edit_description(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод нового описания задания"""
-        if not await self._check_admin_access(update):
-            return
-        
         new_description = update.message.text.strip()
         task_id = context.user_data.get('editing_task_id')
         
         if not task_id:
             await update.message.reply_text("❌ Ошибка: ID задания не найден.")
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             return
         
         # Обновляем описание в базе данных
         try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('UPDATE tasks SET description = ? WHERE id = ?', (new_description, task_id))
-                conn.commit()
+            await self._write(
+                'UPDATE tasks SET description = ? WHERE id = ?', (new_description, task_id)
+            )
             
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
             await update.message.reply_text(
-                f"✅ **Описание задания успешно изменено!**\n\n"
-                f"📄 **Новое описание:** {new_description}",
-                parse_mode='Markdown',
+                f"✅ <b>Описание задания успешно изменено!</b>\n\n"
+                f"📄 <b>Новое описание:</b> {html.escape(new_description)}",
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
             # Очищаем данные
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             
         except Exception as e:
             logger.error(f"Ошибка при изменении описания задания: {e}")
@@ -1731,16 +2064,13 @@ class AdminBot:
         await query.answer()
         
         data = query.data
-        task_id = int(data.split('_')[2])  # edit_title_123
+        task_id = int(data.removeprefix('edit_title_'))  # edit_title_123
         
         # Сохраняем ID задания в контекст
         context.user_data['editing_task_id'] = task_id
         
         # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT title FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
+        task = await self._fetch_one('SELECT title FROM tasks WHERE id = ?', (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
@@ -1749,10 +2079,10 @@ class AdminBot:
         current_title = task[0] or "не указано"
         
         text = (
-            f"✏️ **Редактирование названия задания #{task_id}**\n\n"
-            f"📝 **Текущее название:** {current_title}\n\n"
+            f"✏️ <b>Редактирование названия задания #{task_id}</b>\n\n"
+            f"📝 <b>Текущее название:</b> {html.escape(current_title)}\n\n"
             "Введите новое название задания:\n\n"
-            "💡 _Для отмены введите_ `/cancel`"
+            "💡 <i>Для отмены введите</i> <code>/cancel</code>"
         )
         
         keyboard = [
@@ -1761,7 +2091,7 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
@@ -1774,16 +2104,13 @@ class AdminBot:
         await query.answer()
         
         data = query.data
-        task_id = int(data.split('_')[2])  # edit_link_123
+        task_id = int(data.removeprefix('edit_link_'))  # edit_link_123
         
         # Сохраняем ID задания в контекст
         context.user_data['editing_task_id'] = task_id
         
-        # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT link FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
+        # Получаем задание
+        task = await self._fetch_one('SELECT link FROM tasks WHERE id = ?', (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
@@ -1792,8 +2119,8 @@ class AdminBot:
         current_link = task[0] or "не указана"
         
         text = (
-            f"✏️ **Редактирование ссылки задания #{task_id}**\n\n"
-            f"🔗 **Текущая ссылка:** {current_link}\n\n"
+            f"✏️ <b>Редактирование ссылки задания #{task_id}</b>\n\n"
+            f"🔗 <b>Текущая ссылка:</b> {html.escape(current_link)}\n\n"
             "Введите новую ссылку на задание (или напишите 'нет' чтобы убрать ссылку):"
         )
         
@@ -1803,7 +2130,7 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
@@ -1812,9 +2139,6 @@ class AdminBot:
 
     async def handle_edit_link(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод новой ссылки задания"""
-        if not await self._check_admin_access(update):
-            return
-        
         new_link = update.message.text.strip()
         if new_link.lower() in ['нет', 'no', '-', 'убрать']:
             new_link = None
@@ -1822,31 +2146,28 @@ class AdminBot:
         task_id = context.user_data.get('editing_task_id')
         if not task_id:
             await update.message.reply_text("❌ Ошибка: ID задания не найден.")
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             return
         
         # Обновляем ссылку в базе данных
         try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('UPDATE tasks SET link = ? WHERE id = ?', (new_link, task_id))
-                conn.commit()
+            await self._write('UPDATE tasks SET link = ? WHERE id = ?', (new_link, task_id))
             
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
             await update.message.reply_text(
-                f"✅ **Ссылка задания успешно изменена!**\n\n"
-                f"🔗 **Новая ссылка:** {new_link or 'не указана'}",
-                parse_mode='Markdown',
+                f"✅ <b>Ссылка задания успешно изменена!</b>\n\n"
+                f"🔗 <b>Новая ссылка:</b> {html.escape(new_link or 'не указана')}",
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
             # Очищаем данные
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             
         except Exception as e:
             logger.error(f"Ошибка при изменении ссылки задания: {e}")
@@ -1856,28 +2177,20 @@ class AdminBot:
 
     async def _toggle_task_status(self, query, data):
         """Переключает статус задания (открыто/закрыто)"""
-        task_id = int(data.split('_')[2])  # toggle_task_123
+        task_id = int(data.removeprefix('toggle_task_'))  # toggle_task_123
         
-        # Переключаем статус
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Получаем текущий статус
-            cursor.execute('SELECT is_open FROM tasks WHERE id = ?', (task_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                await query.answer("❌ Задание не найдено!")
-                return
-            
-            current_status = result[0]
-            new_status = not current_status
-            
-            # Обновляем статус
-            cursor.execute('UPDATE tasks SET is_open = ? WHERE id = ?', (new_status, task_id))
-            conn.commit()
+        # Переключаем статус одним запросом и сразу получаем новое значение
+        result = await asyncio.to_thread(
+            self._write_returning_sync,
+            'UPDATE tasks SET is_open = NOT is_open WHERE id = ? RETURNING is_open', (task_id,)
+        )
         
-        status_text = "открыто" if new_status else "закрыто"
+        if not result:
+            await query.answer("❌ Задание не найдено!")
+            return
+        
+        status_text = "открыто" if result[0] else "закрыто"
+        self._invalidate_menu_cache()
         await query.answer(f"✅ Задание {status_text}!")
         
         # Возвращаемся к странице задания
@@ -1885,29 +2198,22 @@ class AdminBot:
 
     async def _delete_task(self, query, data):
         """Удаляет задание с подтверждением"""
-        task_id = int(data.split('_')[2])  # delete_task_123
+        task_id = int(data.removeprefix('delete_task_'))  # delete_task_123
         
-        # Получаем информацию о задании и количестве отчетов
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT title FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
-            
-            if not task:
-                await query.answer("❌ Задание не найдено!")
-                return
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE task_id = ?', (task_id,))
-            reports_count = cursor.fetchone()[0]
+        # Название задания и количество отчетов (счетчик ведут триггеры)
+        task = await self._fetch_one('SELECT title, submissions_count FROM tasks WHERE id = ?', (task_id,))
+        
+        if not task:
+            await query.answer("❌ Задание не найдено!")
+            return
         
-        title = task[0]
+        title, reports_count = task
         
         text = (
-            f"🗑️ **Удаление задания**\n\n"
-            f"📝 **Задание:** {title}\n"
-            f"📤 **Отчетов:** {reports_count}\n\n"
-            f"⚠️ **Внимание!** Это действие нельзя отменить.\n"
+            f"🗑️ <b>Удаление задания</b>\n\n"
+            f"📝 <b>Задание:</b> {html.escape(title)}\n"
+            f"📤 <b>Отчетов:</b> {reports_count}\n\n"
+            f"⚠️ <b>Внимание!</b> Это действие нельзя отменить.\n"
             f"Все связанные отчеты также будут удалены.\n\n"
             f"Вы уверены?"
         )
@@ -1919,26 +2225,27 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _confirm_delete_task(self, query, data):
         """Подтверждает удаление задания"""
-        task_id = int(data.split('_')[2])  # confirm_delete_123
+        task_id = int(data.removeprefix('confirm_delete_'))  # confirm_delete_123
         
         try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Удаляем сначала все отчеты по заданию
-                cursor.execute('DELETE FROM submissions WHERE task_id = ?', (task_id,))
-                
-                # Затем удаляем само задание
-                cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-                
-                conn.commit()
-            
+            # Отчеты по заданию удаляет триггер trg_tasks_delete_submissions
+            await asyncio.to_thread(self._write_sync, 'DELETE FROM tasks WHERE id = ?', (task_id,))
+            
+            # Снимок списка берем уже после коммита: из него пропала ровно одна
+            # строка, поэтому убираем ее без нового запроса и с прежним временем
+            snapshot = self._menu_cache.get('tasks_list')
+            self._invalidate_menu_cache()
+            if snapshot:
+                self._menu_cache['tasks_list'] = (snapshot[0], [t for t in snapshot[1] if t[0] != task_id])
+            
+            # Названия могут повторяться, поэтому кэш просто перестраивается
+            self._titles_cache = None
             await query.answer("✅ Задание удалено!")
             
             # Переходим к списку заданий
@@ -1951,105 +2258,88 @@ class AdminBot:
 
     async def _show_task_reports(self, query, data):
         """Показывает отчеты по конкретному заданию"""
-        task_id = int(data.split('_')[2])  # task_reports_123
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Получаем название задания
-            cursor.execute('SELECT title FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
-            
-            if not task:
-                await query.edit_message_text("❌ Задание не найдено.")
-                return
-            
-            # Получаем отчеты по заданию
-            cursor.execute('''
-                SELECT s.id, s.user_id, s.submission_date, s.submission_type, s.status, 
-                       s.is_on_time, u.first_name, u.last_name
+        task_id = int(data.removeprefix('task_reports_'))  # task_reports_123
+        
+        # Название задания и его отчеты
+        tasks, reports = await self._fetch_rows(
+            ('SELECT title FROM tasks WHERE id = ?', (task_id,)),
+            (f'''
+                SELECT s.id, {sql_date_short('s.submission_date')}, s.submission_type, s.status, 
+                       s.is_on_time, {_SQL_USER_NAME}
                 FROM submissions s
                 LEFT JOIN users u ON s.user_id = u.user_id
                 WHERE s.task_id = ?
                 ORDER BY s.submission_date DESC
                 LIMIT 10
-            ''', (task_id,))
-            reports = cursor.fetchall()
+            ''', (task_id,)),
+        )
+        
+        if not tasks:
+            await query.edit_message_text("❌ Задание не найдено.")
+            return
         
-        task_title = task[0]
+        task_title = tasks[0][0]
         
         if not reports:
-            text = f"📋 **Отчеты по заданию**\n{task_title}\n\n📭 Отчетов пока нет."
+            text = f"📋 <b>Отчеты по заданию</b>\n{html.escape(task_title)}\n\n📭 Отчетов пока нет."
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
         else:
-            text = f"📋 **Отчеты по заданию** ({len(reports)})\n{task_title}\n\n"
+            text = f"📋 <b>Отчеты по заданию</b> ({len(reports)})\n{html.escape(task_title)}\n\n"
             
             keyboard = []
             for report in reports:
-                submission_id, user_id, date, sub_type, status, is_on_time, first_name, last_name = report
-                
-                # Форматируем дату
-                date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime("%d.%m %H:%M")
-                
-                # Имя пользователя
-                user_name = f"{first_name or ''} {last_name or ''}".strip() or f"ID{user_id}"
+                submission_id, formatted_date, sub_type, status, is_on_time, user_name = report
+                user_name = user_name[:REPORT_BUTTON_NAME_LEN]
                 
                 # Статусы
-                status_emoji = {"pending": "⏳", "approved": "✅", "rejected": "❌"}.get(status, "❓")
+                status_emoji = _STATUS_EMOJI.get(status, "❓")
                 time_emoji = "⏰" if not is_on_time else "✅"
-                type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(sub_type, "📝")
+                type_emoji = _TYPE_EMOJI.get(sub_type, "📝")
                 
                 button_text = f"{type_emoji}{status_emoji}{time_emoji} {user_name} • {formatted_date}"
                 keyboard.append([InlineKeyboardButton(
-                    button_text[:50],
+                    button_text,
                     callback_data=f"report_{submission_id}"
                 )])
             
             keyboard.append([InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            keyboard.append([_BTN_MAIN_MENU])
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _show_user_profile(self, query, data):
         """Показывает профиль пользователя"""
-        user_id = int(data.split('_')[2])  # user_profile_123
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Получаем информацию о пользователе
-            cursor.execute('''
-                SELECT user_id, username, telegram_first_name, telegram_last_name,
-                       first_name, last_name, participation_type, family_members_count,
-                       children_info, registration_completed, registration_date
-                FROM users WHERE user_id = ?
-            ''', (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                await query.edit_message_text("❌ Пользователь не найден.")
-                return
-            
-            # Статистика пользователя
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE user_id = ?', (user_id,))
-            total_submissions = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE user_id = ? AND status = "approved"', (user_id,))
-            approved_submissions = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM submissions WHERE user_id = ? AND is_on_time = TRUE', (user_id,))
-            on_time_submissions = cursor.fetchone()[0]
+        user_id = int(data.removeprefix('user_profile_'))  # user_profile_123
+        
+        # Пользователь и его статистика одним запросом
+        users, = await self._fetch_rows(('''
+            SELECT u.user_id, u.username, u.telegram_first_name, u.telegram_last_name,
+                   u.first_name, u.last_name, u.participation_type, u.family_members_count,
+                   u.children_info, u.registration_completed, u.registration_date,
+                   COUNT(s.id),
+                   COALESCE(SUM(s.status = 'approved'), 0),
+                   COALESCE(SUM(s.is_on_time = TRUE), 0)
+            FROM users u
+            LEFT JOIN submissions s ON s.user_id = u.user_id
+            WHERE u.user_id = ?
+            GROUP BY u.user_id
+        ''', (user_id,)))
+        
+        if not users:
+            await query.edit_message_text("❌ Пользователь не найден.")
+            return
+        user = users[0]
         
         (uid, username, tg_first, tg_last, first_name, last_name, participation_type,
-         family_count, children_info, registration_completed, reg_date) = user
+         family_count, children_info, registration_completed, reg_date,
+         total_submissions, approved_submissions, on_time_submissions) = user
         
         # Форматируем информацию
         full_name = f"{first_name or ''} {last_name or ''}".strip() or "Не указано"
@@ -2057,26 +2347,26 @@ class AdminBot:
         username_str = f"@{username}" if username else "Не указан"
         
         reg_status = "✅ Завершена" if registration_completed else "❌ Не завершена"
-        participation = {"individual": "👤 Индивидуальное", "family": "👨‍👩‍👧‍👦 Семейное"}.get(participation_type, participation_type)
+        participation = _PARTICIPATION_TEXT.get(participation_type, participation_type)
         
         if reg_date:
-            reg_date_obj = datetime.fromisoformat(reg_date.replace('Z', '+00:00'))
+            reg_date_obj = _parse_iso(reg_date)
             formatted_reg_date = reg_date_obj.strftime("%d.%m.%Y в %H:%M")
         else:
             formatted_reg_date = "Не указана"
         
         text = (
-            f"👤 **Профиль пользователя**\n\n"
-            f"🆔 **ID:** {uid}\n"
-            f"👤 **Имя в Telegram:** {tg_name}\n"
-            f"📱 **Username:** {username_str}\n"
-            f"📝 **Полное имя:** {full_name}\n"
-            f"🏠 **Тип участия:** {participation}\n"
-            f"👨‍👩‍👧‍👦 **Участников в семье:** {family_count or 1}\n"
-            f"👶 **Информация о детях:** {children_info or 'Не указана'}\n"
-            f"✅ **Регистрация:** {reg_status}\n"
-            f"📅 **Дата регистрации:** {formatted_reg_date}\n\n"
-            f"📊 **Статистика:**\n"
+            f"👤 <b>Профиль пользователя</b>\n\n"
+            f"🆔 <b>ID:</b> {uid}\n"
+            f"👤 <b>Имя в Telegram:</b> {html.escape(tg_name)}\n"
+            f"📱 <b>Username:</b> {html.escape(username_str)}\n"
+            f"📝 <b>Полное имя:</b> {html.escape(full_name)}\n"
+            f"🏠 <b>Тип участия:</b> {participation}\n"
+            f"👨‍👩‍👧‍👦 <b>Участников в семье:</b> {family_count or 1}\n"
+            f"👶 <b>Информация о детях:</b> {html.escape(children_info or 'Не указана')}\n"
+            f"✅ <b>Регистрация:</b> {reg_status}\n"
+            f"📅 <b>Дата регистрации:</b> {formatted_reg_date}\n\n"
+            f"📊 <b>Статистика:</b>\n"
             f"   • Всего отчетов: {total_submissions}\n"
             f"   • Одобрено: {approved_submissions}\n"
             f"   • В срок: {on_time_submissions}\n"
@@ -2086,85 +2376,102 @@ class AdminBot:
         keyboard = [
             [InlineKeyboardButton("📤 Отчеты пользователя", callback_data=f"user_reports_{user_id}")],
             [InlineKeyboardButton("🔙 Назад", callback_data="reports_menu")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ]
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _show_user_reports(self, query, data):
-        """Показывает отчеты конкретного пользователя"""
-        user_id = int(data.split('_')[2])  # user_reports_123
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Получаем имя пользователя
-            cursor.execute('SELECT first_name, last_name FROM users WHERE user_id = ?', (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                await query.edit_message_text("❌ Пользователь не найден.")
-                return
-            
-            user_name = f"{user[0] or ''} {user[1] or ''}".strip() or f"ID{user_id}"
-            
-            # Получаем отчеты пользователя
-            cursor.execute('''
-                SELECT s.id, s.submission_date, s.submission_type, s.status, 
-                       s.is_on_time, t.title
+        """Показывает отчеты конкретного пользователя
+        
+        Страницы листаются от новых к старым по id последнего показанного
+        отчета: user_reports_<user_id> или user_reports_<user_id>_<id>.
+        """
+        user_id, _, before = data.removeprefix('user_reports_').partition('_')
+        user_id = int(user_id)
+        if before:
+            keyset = "AND s.id < ?"
+            params = (user_id, int(before), USER_REPORTS_PAGE_SIZE + 1)
+        else:
+            keyset = ""
+            params = (user_id, USER_REPORTS_PAGE_SIZE + 1)
+        
+        # Имя пользователя, страница его отчетов и их общее число
+        users, reports, totals = await self._fetch_rows(
+            ('SELECT first_name, last_name FROM users WHERE user_id = ?', (user_id,)),
+            (f'''
+                SELECT s.id, {sql_date_short('s.submission_date')} AS short_date, s.submission_type,
+                       s.status, s.is_on_time, t.title AS task_title
                 FROM submissions s
                 JOIN tasks t ON s.task_id = t.id
-                WHERE s.user_id = ?
-                ORDER BY s.submission_date DESC
-                LIMIT 10
-            ''', (user_id,))
-            reports = cursor.fetchall()
+                WHERE s.user_id = ? {keyset}
+                ORDER BY s.id DESC
+                LIMIT ?
+            ''', params),
+            ('SELECT COUNT(*) FROM submissions WHERE user_id = ?', (user_id,)),
+        )
+        
+        # Лишняя строка означает, что есть следующая страница
+        has_next = len(reports) > USER_REPORTS_PAGE_SIZE
+        reports = reports[:USER_REPORTS_PAGE_SIZE]
+        
+        if not users:
+            await query.edit_message_text("❌ Пользователь не найден.")
+            return
+        
+        user_name = _format_user(users[0]['first_name'], users[0]['last_name'], user_id)
         
         if not reports:
-            text = f"👤 **Отчеты пользователя**\n{user_name}\n\n📭 Отчетов пока нет."
+            text = f"👤 <b>Отчеты пользователя</b>\n{html.escape(user_name)}\n\n📭 Отчетов пока нет."
             keyboard = [
                 [InlineKeyboardButton("👤 Профиль", callback_data=f"user_profile_{user_id}")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
         else:
-            text = f"👤 **Отчеты пользователя** ({len(reports)})\n{user_name}\n\n"
+            text = (
+                f"👤 <b>Отчеты пользователя</b> (показано: {len(reports)} из {totals[0][0]})\n"
+                f"{html.escape(user_name)}\n\n"
+            )
             
             keyboard = []
             for report in reports:
-                submission_id, date, sub_type, status, is_on_time, task_title = report
-                
-                # Форматируем дату
-                date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime("%d.%m %H:%M")
-                
                 # Статусы
-                status_emoji = {"pending": "⏳", "approved": "✅", "rejected": "❌"}.get(status, "❓")
-                time_emoji = "⏰" if not is_on_time else "✅"
-                type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(sub_type, "📝")
+                status_emoji = _STATUS_EMOJI.get(report['status'], "❓")
+                time_emoji = "⏰" if not report['is_on_time'] else "✅"
+                type_emoji = _TYPE_EMOJI.get(report['submission_type'], "📝")
                 
-                button_text = f"{type_emoji}{status_emoji}{time_emoji} {task_title[:20]}... • {formatted_date}"
+                button_text = (
+                    f"{type_emoji}{status_emoji}{time_emoji} "
+                    f"{report['task_title'][:REPORT_BUTTON_NAME_LEN]} • {report['short_date']}"
+                )
                 keyboard.append([InlineKeyboardButton(
-                    button_text[:50],
-                    callback_data=f"report_{submission_id}"
+                    button_text,
+                    callback_data=f"report_{report['id']}"
+                )])
+            
+            if has_next:
+                keyboard.append([InlineKeyboardButton(
+                    "📄 Показать еще",
+                    callback_data=f"user_reports_{user_id}_{reports[-1]['id']}"
                 )])
             
             keyboard.append([InlineKeyboardButton("👤 Профиль", callback_data=f"user_profile_{user_id}")])
-            keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")])
+            keyboard.append([_BTN_MAIN_MENU])
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _handle_export_data(self, query):
         """Обрабатывает команду экспорта данных"""
         text = (
-            "📊 **Экспорт данных**\n\n"
+            "📊 <b>Экспорт данных</b>\n\n"
             "Выберите тип данных для экспорта:"
         )
         
@@ -2178,23 +2485,23 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _handle_clear_logs(self, query):
         """Обрабатывает команду очистки логов"""
         # Проверяем размер логов
-        log_stats = self._get_log_stats()
+        log_stats = await asyncio.to_thread(self._get_log_stats)
         
         text = (
-            "🧹 **Очистка системных логов**\n\n"
-            f"📂 **Текущий статус:**\n"
+            "🧹 <b>Очистка системных логов</b>\n\n"
+            f"📂 <b>Текущий статус:</b>\n"
             f"• Потенциальные отчеты: {log_stats['potential_reports']}\n"
             f"• Обработанные офлайн-сообщения: {log_stats['processed_offline']}\n"
             f"• Записи состояний: {log_stats['user_states']}\n"
             f"• Старые запросы поддержки: {log_stats['old_support_requests']}\n\n"
-            f"⚠️ **Внимание!** Это действие необратимо.\n"
+            f"⚠️ <b>Внимание!</b> Это действие необратимо.\n"
             f"Рекомендуется сначала сделать экспорт данных.\n\n"
             f"Продолжить очистку?"
         )
@@ -2206,60 +2513,61 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _confirm_clear_logs(self, query):
         """Подтверждает очистку логов"""
         try:
-            cleaned = self._perform_log_cleanup()
+            # Удаление и incremental_vacuum идут в рабочем потоке
+            cleaned = await asyncio.to_thread(self._perform_log_cleanup)
             
             text = (
-                "✅ **Очистка завершена успешно!**\n\n"
-                f"📊 **Результаты:**\n"
+                "✅ <b>Очистка завершена успешно!</b>\n\n"
+                f"📊 <b>Результаты:</b>\n"
                 f"• Удалено потенциальных отчетов: {cleaned['potential_reports']}\n"
                 f"• Удалено офлайн-сообщений: {cleaned['offline_messages']}\n"
                 f"• Очищено старых состояний: {cleaned['old_states']}\n"
                 f"• Архивировано запросов поддержки: {cleaned['support_requests']}\n\n"
-                f"💾 **База данных оптимизирована**"
+                f"💾 <b>База данных оптимизирована</b>"
             )
             
         except Exception as e:
             logger.error(f"Ошибка при очистке логов: {e}")
             text = (
-                "❌ **Ошибка при очистке!**\n\n"
-                f"Подробности: {str(e)}\n\n"
+                "❌ <b>Ошибка при очистке!</b>\n\n"
+                f"Подробности: {html.escape(str(e))}\n\n"
                 f"Проверьте логи для получения дополнительной информации."
             )
         
         keyboard = [
             [InlineKeyboardButton("🔧 Системное меню", callback_data="system_menu")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ]
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
     async def _handle_specific_export(self, query, data):
         """Обрабатывает команду экспорта конкретных данных"""
-        export_type = data.split('_')[1]  # export_users -> users
+        export_type = data.removeprefix('export_')  # export_users -> users
         
         try:
             # Генерируем файл экспорта
             file_path = await self._generate_export_file(export_type)
             
             if file_path:
-                # Отправляем файл пользователю
-                with open(file_path, 'rb') as file:
-                    await query.message.reply_document(
-                        document=file,
-                        filename=os.path.basename(file_path),
-                        caption=f"📊 Экспорт данных: {self._get_export_type_name(export_type)}"
-                    )
+                # Отправляем файл пользователю (чтение в рабочем потоке)
+                file = await asyncio.to_thread(_read_file, file_path)
+                await query.message.reply_document(
+                    document=file,
+                    filename=os.path.basename(file_path),
+                    caption=f"📊 Экспорт данных: {self._get_export_type_name(export_type)}"
+                )
                 
                 # Удаляем временный файл
                 os.remove(file_path)
@@ -2280,38 +2588,41 @@ class AdminBot:
         try:
             full_path = os.path.join("uploaded_files", file_path)
             
-            if not os.path.exists(full_path):
+            # PTB все равно читает файл целиком, поэтому читаем его сами вне цикла
+            # событий; отсутствие файла видно по исключению, без отдельного stat
+            try:
+                file = await asyncio.to_thread(_read_file, full_path)
+            except FileNotFoundError:
                 await query.message.reply_text(
-                    "❌ *Файл не найден на сервере*\n\n"
-                    f"Файл был удален или перемещен\\.\n"
-                    f"Путь: `{file_path}`",
-                    parse_mode='MarkdownV2'
+                    "❌ <b>Файл не найден на сервере</b>\n\n"
+                    "Файл был удален или перемещен.\n"
+                    f"Путь: <code>{html.escape(file_path)}</code>",
+                    parse_mode='HTML'
                 )
                 return False
             
             # Определяем тип файла по расширению
             file_extension = file_path.lower().split('.')[-1] if '.' in file_path else ''
             
-            with open(full_path, 'rb') as file:
-                if file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'] or 'photos/' in file_path:
-                    await query.message.reply_photo(
-                        photo=file,
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                elif file_extension in ['mp4', 'avi', 'mov', 'mkv', 'webm'] or 'videos/' in file_path:
-                    await query.message.reply_video(
-                        video=file,
-                        caption=caption,
-                        parse_mode='Markdown'
-                    )
-                else:
-                    await query.message.reply_document(
-                        document=file,
-                        caption=caption,
-                        parse_mode='Markdown',
-                        filename=os.path.basename(file_path)
-                    )
+            if file_extension in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp'] or 'photos/' in file_path:
+                await query.message.reply_photo(
+                    photo=file,
+                    caption=caption,
+                    parse_mode='HTML'
+                )
+            elif file_extension in ['mp4', 'avi', 'mov', 'mkv', 'webm'] or 'videos/' in file_path:
+                await query.message.reply_video(
+                    video=file,
+                    caption=caption,
+                    parse_mode='HTML'
+                )
+            else:
+                await query.message.reply_document(
+                    document=file,
+                    caption=caption,
+                    parse_mode='HTML',
+                    filename=os.path.basename(file_path)
+                )
             
             await query.answer("✅ Файл отправлен!")
             return True
@@ -2323,32 +2634,35 @@ class AdminBot:
 
     async def _show_file(self, query, data):
         """Показывает файл"""
-        submission_id = int(data.split('_')[2])  # show_file_123
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT s.file_id, s.file_path, s.submission_type, s.content, 
-                       u.first_name, u.last_name, t.title
-                FROM submissions s
-                LEFT JOIN users u ON s.user_id = u.user_id
-                LEFT JOIN tasks t ON s.task_id = t.id
-                WHERE s.id = ?
-            ''', (submission_id,))
-            result = cursor.fetchone()
+        submission_id = int(data.removeprefix('show_file_'))  # show_file_123
+        
+        # Файл, автор и задание одним запросом: кнопка показывается только у отчетов с файлом
+        result = await self._fetch_one('''
+            SELECT s.file_id, s.file_path, s.submission_type, s.content,
+                   u.first_name, u.last_name, t.title AS task_title
+            FROM submissions s
+            LEFT JOIN users u ON s.user_id = u.user_id
+            LEFT JOIN tasks t ON s.task_id = t.id
+            WHERE s.id = ?
+        ''', (submission_id,))
         
         if not result:
             await query.answer("❌ Файл не найден!")
             return
         
-        file_id, file_path, submission_type, content, first_name, last_name, task_title = result
+        file_id, file_path, submission_type = result['file_id'], result['file_path'], result['submission_type']
         
         if not file_id and not file_path:
             await query.answer("❌ К этому отчету не прикреплен файл!")
             return
         
-        user_name = f"{first_name or ''} {last_name or ''}".strip() or "Пользователь"
-        caption = f"📁 **Файл к отчету**\n\n👤 **От:** {user_name}\n📋 **Задание:** {task_title}\n\n💬 **Комментарий:** {content[:100]}{'...' if len(content) > 100 else ''}"
+        user_name = f"{result['first_name'] or ''} {result['last_name'] or ''}".strip() or "Пользователь"
+        content = result['content']
+        caption = (
+            f"📁 <b>Файл к отчету</b>\n\n👤 <b>От:</b> {html.escape(user_name)}\n"
+            f"📋 <b>Задание:</b> {html.escape(result['task_title'] or '')}\n\n"
+            f"💬 <b>Комментарий:</b> {html.escape(content[:100])}{'...' if len(content) > 100 else ''}"
+        )
         
         # Приоритет: сначала пробуем локальный файл, потом file_id
         if file_path:
@@ -2363,19 +2677,19 @@ class AdminBot:
                     await query.message.reply_photo(
                         photo=file_id,
                         caption=caption,
-                        parse_mode='Markdown'
+                        parse_mode='HTML'
                     )
                 elif submission_type == 'video':
                     await query.message.reply_video(
                         video=file_id,
                         caption=caption,
-                        parse_mode='Markdown'
+                        parse_mode='HTML'
                     )
                 elif submission_type == 'document':
                     await query.message.reply_document(
                         document=file_id,
                         caption=caption,
-                        parse_mode='Markdown'
+                        parse_mode='HTML'
                     )
                 else:
                     await query.answer("❌ Неподдерживаемый тип файла!")
@@ -2393,11 +2707,11 @@ class AdminBot:
                     
                     # Уведомляем пользователя подробнее
                     await query.message.reply_text(
-                        "⚠️ *Файл недоступен*\n\n"
-                        f"Файл к отчету №{submission_id} больше не может быть загружен\\.\n"
-                        "Это происходит когда file\\_id устаревает в системе Telegram\\.\n\n"
-                        "💡 *Решение:* Попросите пользователя отправить файл повторно\\.",
-                        parse_mode='MarkdownV2'
+                        "⚠️ <b>Файл недоступен</b>\n\n"
+                        f"Файл к отчету №{submission_id} больше не может быть загружен.\n"
+                        "Это происходит когда file_id устаревает в системе Telegram.\n\n"
+                        "💡 <b>Решение:</b> Попросите пользователя отправить файл повторно.",
+                        parse_mode='HTML'
                     )
                 else:
                     await query.answer("❌ Ошибка при отправке файла!")
@@ -2406,63 +2720,51 @@ class AdminBot:
 
     async def _handle_potential_report(self, query, data):
         """Обрабатывает потенциальный отчет"""
-        report_id = int(data.split('_')[1])  # potential_123
-        
-        # Получаем информацию о потенциальном отчете
-        reports = self.db.get_potential_reports()
-        potential_report = None
+        report_id = int(data.removeprefix('potential_'))  # potential_123
         
-        for report in reports:
-            if report[0] == report_id:  # report[0] это ID
-                potential_report = report
-                break
+        # Отчет по id вместе с автором и открытые задания для привязки
+        reports, open_tasks = await self._fetch_rows(
+            ('''
+                SELECT o.user_id, o.message_data, o.received_date,
+                       u.first_name, u.last_name, u.username
+                FROM offline_messages o
+                LEFT JOIN users u ON o.user_id = u.user_id
+                WHERE o.id = ? AND o.message_type = 'potential_report' AND o.processed = FALSE
+            ''', (report_id,)),
+            ('SELECT id, title FROM tasks WHERE is_open = TRUE ORDER BY id DESC LIMIT 5', ()),
+        )
         
-        if not potential_report:
+        if not reports:
             await query.edit_message_text("❌ Потенциальный отчет не найден.")
             return
         
-        report_id, user_id, message_data, message_type, received_date = potential_report
+        potential_report = reports[0]
+        user_id = potential_report['user_id']
         
         try:
-            data_dict = json.loads(message_data)
+            data_dict = _parse_offline_payload(report_id, potential_report['message_data'])
             content = data_dict.get('content', 'Нет содержимого')
             msg_type = data_dict.get('type', 'text')
             file_id = data_dict.get('file_id')
             
             # Форматируем дату
-            date_obj = datetime.fromisoformat(received_date.replace('Z', '+00:00'))
-            formatted_date = date_obj.strftime("%d.%m.%Y в %H:%M МСК")
-            
-            # Получаем информацию о пользователе
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT first_name, last_name, username FROM users WHERE user_id = ?', (user_id,))
-                user_info = cursor.fetchone()
-            
-            if user_info:
-                first_name, last_name, username = user_info
-                user_name = f"{first_name or ''} {last_name or ''}".strip() or f"ID{user_id}"
-                if username:
-                    user_name += f" (@{username})"
-            else:
-                user_name = f"ID{user_id}"
+            date_obj = _parse_iso(potential_report['received_date'])
+            formatted_date = _fmt_long(date_obj)
             
-            type_emoji = {"text": "📝", "photo": "📸", "video": "🎥", "document": "📄"}.get(msg_type, "📝")
+            # Без записи в users все поля NULL и имя будет "ID123"
+            user_name = _format_user(potential_report['first_name'], potential_report['last_name'],
+                                     user_id, potential_report['username'])
+            
+            type_emoji = _TYPE_EMOJI.get(msg_type, "📝")
             
             text = (
-                f"🔍 **Потенциальный отчет #{report_id}**\n\n"
-                f"👤 **Пользователь:** {user_name}\n"
-                f"📅 **Дата получения:** {formatted_date}\n"
-                f"📝 **Тип:** {type_emoji} {msg_type.title()}\n\n"
-                f"💬 **Содержимое:**\n{content[:500]}{'...' if len(content) > 500 else ''}"
+                f"🔍 <b>Потенциальный отчет #{report_id}</b>\n\n"
+                f"👤 <b>Пользователь:</b> {html.escape(user_name)}\n"
+                f"📅 <b>Дата получения:</b> {formatted_date}\n"
+                f"📝 <b>Тип:</b> {type_emoji} {html.escape(str(msg_type).title())}\n\n"
+                f"💬 <b>Содержимое:</b>\n{html.escape(content[:500])}{'...' if len(content) > 500 else ''}"
             )
             
-            # Получаем список открытых заданий для привязки
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id, title FROM tasks WHERE is_open = TRUE ORDER BY id DESC LIMIT 5')
-                open_tasks = cursor.fetchall()
-            
             keyboard = []
             
             # Кнопки для привязки к заданиям
@@ -2486,12 +2788,12 @@ class AdminBot:
             
             keyboard.extend([
                 [InlineKeyboardButton("🔍 Потенциальные отчеты", callback_data="potential_reports")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ])
             
             await query.edit_message_text(
                 text,
-                parse_mode='Markdown',
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
@@ -2503,42 +2805,30 @@ class AdminBot:
 
     def _get_log_stats(self) -> Dict[str, int]:
         """Получает статистику для очистки логов"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Потенциальные отчеты
-            cursor.execute("SELECT COUNT(*) FROM offline_messages WHERE message_type = 'potential_report' AND processed = FALSE")
-            potential_reports = cursor.fetchone()[0]
-            
-            # Обработанные офлайн-сообщения старше 30 дней
-            cursor.execute("""
-                SELECT COUNT(*) FROM offline_messages 
-                WHERE processed = TRUE 
-                AND received_date < date('now', '-30 days')
-            """)
-            processed_offline = cursor.fetchone()[0]
-            
-            # Записи состояний старше 7 дней
-            cursor.execute("""
-                SELECT COUNT(*) FROM user_states 
-                WHERE last_updated < datetime('now', '-7 days')
-            """)
-            user_states = cursor.fetchone()[0]
-            
-            # Закрытые запросы поддержки старше 30 дней
-            cursor.execute("""
-                SELECT COUNT(*) FROM support_requests 
-                WHERE status = 'closed' 
-                AND request_date < date('now', '-30 days')
-            """)
-            old_support_requests = cursor.fetchone()[0]
-            
-            return {
-                'potential_reports': potential_reports,
-                'processed_offline': processed_offline,
-                'user_states': user_states,
-                'old_support_requests': old_support_requests
-            }
+        # Один запрос: каждый подзапрос идет по своему индексу или таблице
+        with self.db._get_read_connection() as conn:
+            potential_reports, processed_offline, user_states, old_support_requests = conn.execute("""
+                SELECT
+                    -- Потенциальные отчеты
+                    (SELECT COUNT(*) FROM offline_messages
+                     WHERE message_type = 'potential_report' AND processed = FALSE),
+                    -- Обработанные офлайн-сообщения старше 30 дней
+                    (SELECT COUNT(*) FROM offline_messages
+                     WHERE processed = TRUE AND received_date < date('now', '-30 days')),
+                    -- Записи состояний старше 7 дней
+                    (SELECT COUNT(*) FROM user_states
+                     WHERE last_updated < datetime('now', '-7 days')),
+                    -- Закрытые запросы поддержки старше 30 дней
+                    (SELECT COUNT(*) FROM support_requests
+                     WHERE status = 'closed' AND request_date < date('now', '-30 days'))
+            """).fetchone()
+        
+        return {
+            'potential_reports': potential_reports,
+            'processed_offline': processed_offline,
+            'user_states': user_states,
+            'old_support_requests': old_support_requests
+        }
 
     def _perform_log_cleanup(self) -> Dict[str, int]:
         """Выполняет очистку логов и возвращает количество удаленных записей"""
@@ -2561,11 +2851,12 @@ class AdminBot:
             cursor.execute("UPDATE support_requests SET status = 'archived' WHERE status = 'closed' AND request_date < date('now', '-30 days')")
             support_requests = cursor.rowcount
             
-            # Оптимизируем базу данных
-            cursor.execute("VACUUM")
-            
             conn.commit()
             
+            # Возвращаем файлу ограниченное число свободных страниц вместо полного VACUUM:
+            # executescript доводит прагму до конца (execute освободил бы одну страницу)
+            conn.executescript(f"PRAGMA incremental_vacuum({CLEANUP_VACUUM_PAGES});")
+            
             return {
                 'potential_reports': potential_reports,
                 'offline_messages': offline_messages,
@@ -2578,7 +2869,7 @@ class AdminBot:
         import csv
         import tempfile
         
-        timestamp = datetime.now(self.moscow_tz).strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now(MOSCOW_TZ).strftime("%Y%m%d_%H%M%S")
         
         if export_type == "users":
             return await self._export_users_to_csv(timestamp)
@@ -2591,129 +2882,89 @@ class AdminBot:
         else:
             return None
 
-    async def _export_users_to_csv(self, timestamp: str) -> str:
-        """Экспортирует пользователей в CSV"""
+    def _write_csv(self, csvfile, export) -> None:
+        """Пишет выгрузку (заголовок, запрос) в открытый текстовый файл, вычитывая курсор порциями"""
         import csv
-        import tempfile
-        
-        filename = f"eco_bot_users_{timestamp}.csv"
-        temp_path = os.path.join(tempfile.gettempdir(), filename)
         
-        with self.db._get_connection() as conn:
+        header, sql = export
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        with self.db._get_read_connection() as conn:
+            # Обычные кортежи вместо sqlite3.Row: C-реализация csv обходит их быстрее
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT user_id, username, telegram_first_name, telegram_last_name,
-                       first_name, last_name, participation_type, family_members_count,
-                       children_info, registration_completed, registration_date
-                FROM users ORDER BY registration_date DESC
-            """)
-            users = cursor.fetchall()
-        
-        with open(temp_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                'User ID', 'Username', 'Telegram First Name', 'Telegram Last Name',
-                'First Name', 'Last Name', 'Participation Type', 'Family Members',
-                'Children Info', 'Registration Completed', 'Registration Date'
-            ])
-            writer.writerows(users)
-        
-        return temp_path
+            cursor.row_factory = None
+            cursor.execute(sql)
+            while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+                writer.writerows(rows)
 
-    async def _export_tasks_to_csv(self, timestamp: str) -> str:
-        """Экспортирует задания в CSV"""
-        import csv
+    def _export_to_csv(self, export, filename: str) -> str:
+        """Сохраняет выгрузку во временный CSV файл и возвращает путь к нему (в рабочем потоке)"""
         import tempfile
         
-        filename = f"eco_bot_tasks_{timestamp}.csv"
         temp_path = os.path.join(tempfile.gettempdir(), filename)
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, title, description, link, is_open, week_number, deadline, open_date
-                FROM tasks ORDER BY id DESC
-            """)
-            tasks = cursor.fetchall()
-        
         with open(temp_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                'ID', 'Title', 'Description', 'Link', 'Is Open', 'Week Number', 'Deadline', 'Open Date'
-            ])
-            writer.writerows(tasks)
-        
+            self._write_csv(csvfile, export)
         return temp_path
 
+    async def _export_users_to_csv(self, timestamp: str) -> str:
+        """Экспортирует пользователей в CSV"""
+        return await asyncio.to_thread(self._export_to_csv, _USERS_EXPORT, f"eco_bot_users_{timestamp}.csv")
+
+    async def _export_tasks_to_csv(self, timestamp: str) -> str:
+        """Экспортирует задания в CSV"""
+        return await asyncio.to_thread(self._export_to_csv, _TASKS_EXPORT, f"eco_bot_tasks_{timestamp}.csv")
+
     async def _export_submissions_to_csv(self, timestamp: str) -> str:
         """Экспортирует отчеты в CSV"""
-        import csv
-        import tempfile
-        
-        filename = f"eco_bot_submissions_{timestamp}.csv"
-        temp_path = os.path.join(tempfile.gettempdir(), filename)
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT s.id, s.user_id, s.task_id, s.submission_date, s.submission_type,
-                       s.content, s.file_id, s.status, s.is_on_time, t.title, u.first_name, u.last_name
-                FROM submissions s
-                LEFT JOIN tasks t ON s.task_id = t.id
-                LEFT JOIN users u ON s.user_id = u.user_id
-                ORDER BY s.submission_date DESC
-            """)
-            submissions = cursor.fetchall()
-        
-        with open(temp_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                'ID', 'User ID', 'Task ID', 'Submission Date', 'Type',
-                'Content', 'File ID', 'Status', 'On Time', 'Task Title', 'First Name', 'Last Name'
-            ])
-            writer.writerows(submissions)
-        
-        return temp_path
+        return await asyncio.to_thread(self._export_to_csv, _SUBMISSIONS_EXPORT, f"eco_bot_submissions_{timestamp}.csv")
 
     async def _export_full_data(self, timestamp: str) -> str:
         """Создает полный экспорт всех данных в ZIP архиве"""
+        return await asyncio.to_thread(self._write_full_export, timestamp)
+
+    def _write_full_export(self, timestamp: str) -> str:
+        """Собирает ZIP архив полной выгрузки (в рабочем потоке)
+        
+        CSV пишутся прямо в элементы архива, без промежуточных файлов.
+        """
+        import io
         import zipfile
         import tempfile
         
-        # Создаем временные CSV файлы
-        users_file = await self._export_users_to_csv(timestamp)
-        tasks_file = await self._export_tasks_to_csv(timestamp)
-        submissions_file = await self._export_submissions_to_csv(timestamp)
+        users_name = f"eco_bot_users_{timestamp}.csv"
+        tasks_name = f"eco_bot_tasks_{timestamp}.csv"
+        submissions_name = f"eco_bot_submissions_{timestamp}.csv"
+        members = (
+            (users_name, _USERS_EXPORT),
+            (tasks_name, _TASKS_EXPORT),
+            (submissions_name, _SUBMISSIONS_EXPORT),
+        )
         
         # Создаем ZIP архив
         zip_filename = f"eco_bot_full_export_{timestamp}.zip"
         zip_path = os.path.join(tempfile.gettempdir(), zip_filename)
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(users_file, os.path.basename(users_file))
-            zipf.write(tasks_file, os.path.basename(tasks_file))
-            zipf.write(submissions_file, os.path.basename(submissions_file))
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=EXPORT_ZIP_LEVEL) as zipf:
+            for name, export in members:
+                with zipf.open(name, 'w') as raw, \
+                        io.TextIOWrapper(raw, encoding='utf-8', newline='') as csvfile:
+                    self._write_csv(csvfile, export)
             
             # Добавляем файл с метаданными
             metadata = f"""Экспорт данных Эко-бота
-Дата создания: {datetime.now(self.moscow_tz).strftime('%d.%m.%Y %H:%M:%S МСК')}
+Дата создания: {datetime.now(MOSCOW_TZ).strftime('%d.%m.%Y %H:%M:%S МСК')}
 Версия: 1.0
 
 Содержимое архива:
-- {os.path.basename(users_file)} - данные пользователей
-- {os.path.basename(tasks_file)} - данные заданий  
-- {os.path.basename(submissions_file)} - данные отчетов
+- {users_name} - данные пользователей
+- {tasks_name} - данные заданий  
+- {submissions_name} - данные отчетов
 
 Кодировка: UTF-8
 Разделитель CSV: запятая
 """
             zipf.writestr("README.txt", metadata.encode('utf-8'))
         
-        # Удаляем временные CSV файлы
-        os.remove(users_file)
-        os.remove(tasks_file)
-        os.remove(submissions_file)
-        
         return zip_path
 
     def _get_export_type_name(self, export_type: str) -> str:
@@ -2726,84 +2977,63 @@ class AdminBot:
         }
         return names.get(export_type, export_type)
 
-    async def _assign_potential_to_task(self, query, data):
-        """Привязывает потенциальный отчет к заданию"""
-        report_id, task_id = data.split('_')[2:]
+    def _assign_potential_sync(self, report_id: int, task_id: int) -> Optional[str]:
+        """Привязывает потенциальный отчет к заданию одной транзакцией (в рабочем потоке)
         
-        # Получаем информацию о задании
+        Отчет собирается INSERT ... SELECT прямо из offline_messages, без
+        предварительных выборок задания и сообщения. Возвращает текст ошибки,
+        если задание или отчет не найдены, иначе None.
+        """
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT id, title, description, link, is_open, week_number, deadline, open_date
-                FROM tasks WHERE id = ?
-            ''', (task_id,))
-            task = cursor.fetchone()
+                INSERT INTO submissions (user_id, task_id, submission_date, submission_type, content, file_id, status, is_on_time)
+                SELECT o.user_id, t.id, ?, 'text',
+                       COALESCE(json_extract(o.message_data, '$.content'), 'Нет содержимого'),
+                       json_extract(o.message_data, '$.file_id'), 'pending', TRUE
+                FROM offline_messages o
+                JOIN tasks t ON t.id = ?
+                WHERE o.id = ?
+            ''', (datetime.now(MOSCOW_TZ).isoformat(), task_id, report_id))
+            
+            if not cursor.rowcount:
+                # Ничего не вставлено: уточняем, чего не хватает
+                cursor.execute('SELECT 1 FROM tasks WHERE id = ?', (task_id,))
+                return "❌ Потенциальный отчет не найден." if cursor.fetchone() else "❌ Задание не найдено."
+            
+            # Новый отчет и отметка об обработке фиксируются вместе
+            cursor.execute('UPDATE offline_messages SET processed = TRUE WHERE id = ?', (report_id,))
+        return None
+
+    async def _assign_potential_to_task(self, query, data):
+        """Привязывает потенциальный отчет к заданию"""
+        report_id, task_id = map(int, data.removeprefix('assign_potential_').split('_'))
         
-        if not task:
-            await query.edit_message_text("❌ Задание не найдено.")
+        try:
+            error = await asyncio.to_thread(self._assign_potential_sync, report_id, task_id)
+        except Exception as e:
+            logger.error(f"Ошибка при привязке потенциального отчета: {e}")
+            await query.answer("❌ Ошибка при привязке потенциального отчета!")
             return
         
-        task_id, title, description, link, is_open, week_number, deadline, open_date = task
-        
-        # Получаем информацию о потенциальном отчете
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, user_id, message_data, message_type, received_date
-                FROM offline_messages WHERE id = ?
-            ''', (report_id,))
-            potential_report = cursor.fetchone()
-        
-        if not potential_report:
-            await query.edit_message_text("❌ Потенциальный отчет не найден.")
+        if error:
+            await query.edit_message_text(error)
             return
         
-        report_id, user_id, message_data, message_type, received_date = potential_report
+        self._invalidate_menu_cache()
+        await query.answer("✅ Потенциальный отчет привязан к заданию!")
         
-        try:
-            data_dict = json.loads(message_data)
-            content = data_dict.get('content', 'Нет содержимого')
-            msg_type = data_dict.get('type', 'text')
-            file_id = data_dict.get('file_id')
-            
-            # Создаем новый отчет
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO submissions (user_id, task_id, submission_date, submission_type, content, file_id, status, is_on_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (user_id, task_id, datetime.now(self.moscow_tz).isoformat(), 'text', content, file_id, 'pending', True))
-                submission_id = cursor.lastrowid
-                conn.commit()
-            
-            # Обновляем статус потенциального отчета
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE offline_messages SET processed = TRUE WHERE id = ?
-                ''', (report_id,))
-                conn.commit()
-            
-            await query.answer("✅ Потенциальный отчет привязан к заданию!")
-            
-            # Возвращаемся к списку заданий
-            await self._show_tasks_list(query)
-            
-        except Exception as e:
-            logger.error(f"Ошибка при привязке потенциального отчета: {e}")
-            await query.answer("❌ Ошибка при привязке потенциального отчета!")
+        # Возвращаемся к списку заданий
+        await self._show_tasks_list(query)
 
     async def _mark_potential_processed(self, query, data):
         """Отмечает потенциальный отчет как обработанный"""
-        report_id = int(data.split('_')[1])  # mark_processed_123
+        report_id = int(data.removeprefix('mark_processed_'))  # mark_processed_123
         
-        # Обновляем статус в базе данных
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE offline_messages SET processed = TRUE WHERE id = ?
-            ''', (report_id,))
-            conn.commit()
+        # Обновляем статус в базе данных (кэш меню сбрасывает _write)
+        await self._write(
+            'UPDATE offline_messages SET processed = TRUE WHERE id = ?', (report_id,)
+        )
         
         await query.answer("✅ Потенциальный отчет отмечен как обработанный!")
         
@@ -2812,32 +3042,19 @@ class AdminBot:
 
     async def _delete_potential_report(self, query, data):
         """Удаляет потенциальный отчет"""
-        report_id = int(data.split('_')[1])  # delete_potential_123
-        
-        # Получаем информацию о потенциальном отчете
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, user_id, message_data, message_type, received_date
-                FROM offline_messages WHERE id = ?
-            ''', (report_id,))
-            potential_report = cursor.fetchone()
-        
-        if not potential_report:
-            await query.edit_message_text("❌ Потенциальный отчет не найден.")
-            return
-        
-        report_id, user_id, message_data, message_type, received_date = potential_report
+        report_id = int(data.removeprefix('delete_potential_'))  # delete_potential_123
         
         try:
-            # Удаляем потенциальный отчет
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    DELETE FROM offline_messages WHERE id = ?
-                ''', (report_id,))
-                conn.commit()
+            # Удаляем потенциальный отчет; RETURNING заменяет предварительную проверку
+            deleted = await asyncio.to_thread(
+                self._write_returning_sync,
+                _SQL_DELETE_POTENTIAL, (report_id,)
+            )
+            if not deleted:
+                await query.edit_message_text("❌ Потенциальный отчет не найден.")
+                return
             
+            self._invalidate_menu_cache()
             await query.answer("✅ Потенциальный отчет удален!")
             
             # Возвращаемся к списку заданий
@@ -2849,25 +3066,19 @@ class AdminBot:
 
     async def _show_potential_file(self, query, data):
         """Показывает файл потенциального отчета"""
-        report_id = int(data.split('_')[3])  # show_potential_file_123
+        report_id = int(data.removeprefix('show_potential_file_'))  # show_potential_file_123
         
-        # Получаем информацию о потенциальном отчете из offline_messages
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT user_id, message_data
-                FROM offline_messages WHERE id = ?
-            ''', (report_id,))
-            result = cursor.fetchone()
+        # Потенциальный отчет вместе с именем автора одним запросом
+        result = await self._fetch_one(_SQL_POTENTIAL_WITH_AUTHOR, (report_id,))
         
         if not result:
             await query.answer("❌ Потенциальный отчет не найден!")
             return
         
-        user_id, message_data = result
+        user_id, message_data = result['user_id'], result['message_data']
         
         try:
-            data_dict = json.loads(message_data)
+            data_dict = _parse_offline_payload(report_id, message_data)
             file_id = data_dict.get('file_id')
             file_path = data_dict.get('file_path')  # Новое поле
             content = data_dict.get('content', 'Нет содержимого')
@@ -2877,17 +3088,14 @@ class AdminBot:
                 await query.answer("❌ К этому потенциальному отчету не прикреплен файл!")
                 return
             
-            # Получаем информацию о пользователе
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT first_name, last_name FROM users WHERE user_id = ?', (user_id,))
-                user_info = cursor.fetchone()
-            
             user_name = "Пользователь"
-            if user_info:
-                user_name = f"{user_info[0] or ''} {user_info[1] or ''}".strip() or f"ID{user_id}"
+            if result['known_user'] is not None:
+                user_name = _format_user(result['first_name'], result['last_name'], user_id)
             
-            caption = f"📁 **Файл потенциального отчета**\n\n👤 **От:** {user_name}\n\n💬 **Содержимое:** {content[:100]}{'...' if len(content) > 100 else ''}"
+            caption = (
+                f"📁 <b>Файл потенциального отчета</b>\n\n👤 <b>От:</b> {html.escape(user_name)}\n\n"
+                f"💬 <b>Содержимое:</b> {html.escape(content[:100])}{'...' if len(content) > 100 else ''}"
+            )
             
             # Приоритет: сначала пробуем локальный файл, потом file_id
             if file_path:
@@ -2902,19 +3110,19 @@ class AdminBot:
                         await query.message.reply_photo(
                             photo=file_id,
                             caption=caption,
-                            parse_mode='Markdown'
+                            parse_mode='HTML'
                         )
                     elif msg_type == 'video':
                         await query.message.reply_video(
                             video=file_id,
                             caption=caption,
-                            parse_mode='Markdown'
+                            parse_mode='HTML'
                         )
                     elif msg_type == 'document':
                         await query.message.reply_document(
                             document=file_id,
                             caption=caption,
-                            parse_mode='Markdown'
+                            parse_mode='HTML'
                         )
                     else:
                         await query.answer("❌ Неподдерживаемый тип файла!")
@@ -2932,11 +3140,11 @@ class AdminBot:
                         
                         # Уведомляем пользователя подробнее
                         await query.message.reply_text(
-                            "⚠️ *Файл недоступен*\n\n"
-                            f"Файл потенциального отчета №{report_id} больше не может быть загружен\\.\n"
-                            "Это происходит когда file\\_id устаревает в системе Telegram\\.\n\n"
-                            "💡 *Решение:* Файл был отправлен слишком давно и недоступен для загрузки.",
-                            parse_mode='MarkdownV2'
+                            "⚠️ <b>Файл недоступен</b>\n\n"
+                            f"Файл потенциального отчета №{report_id} больше не может быть загружен.\n"
+                            "Это происходит когда file_id устаревает в системе Telegram.\n\n"
+                            "💡 <b>Решение:</b> Файл был отправлен слишком давно и недоступен для загрузки.",
+                            parse_mode='HTML'
                         )
                     else:
                         await query.answer("❌ Ошибка при отправке файла!")
@@ -2955,16 +3163,13 @@ class AdminBot:
         await query.answer()
         
         data = query.data
-        task_id = int(data.split('_')[3])  # edit_open_date_123
+        task_id = int(data.removeprefix('edit_open_date_'))  # edit_open_date_123
         
         # Сохраняем ID задания в контекст
         context.user_data['editing_task_id'] = task_id
         
         # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT open_date FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
+        task = await self._fetch_one(_SQL_TASK_OPEN_DATE, (task_id,))
         
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
@@ -2973,21 +3178,21 @@ class AdminBot:
         current_open_date = task[0]
         if current_open_date:
             open_date_dt = datetime.fromisoformat(current_open_date)
-            current_open_date_str = open_date_dt.strftime('%d.%m.%Y в %H:%M МСК')
+            current_open_date_str = _fmt_long(open_date_dt)
         else:
             current_open_date_str = "не установлена"
         
         text = (
-            f"✏️ **Редактирование даты открытия задания #{task_id}**\n\n"
-            f"📅 **Текущая дата открытия:** {current_open_date_str}\n\n"
+            f"✏️ <b>Редактирование даты открытия задания #{task_id}</b>\n\n"
+            f"📅 <b>Текущая дата открытия:</b> {current_open_date_str}\n\n"
             "Введите новую дату открытия задания:\n\n"
-            "📋 **Варианты ввода:**\n"
-            "• `сейчас` - открыть сейчас\n"
-            "• `завтра` - завтра в 09:00\n"
-            "• `ДД.ММ.ГГГГ` - конкретная дата в 09:00\n"
-            "• `ДД.ММ.ГГГГ ЧЧ:ММ` - конкретная дата и время\n"
-            "• `неделя` - через неделю в 09:00\n\n"
-            "💡 _Для отмены введите_ `/cancel`"
+            "📋 <b>Варианты ввода:</b>\n"
+            "• <code>сейчас</code> - открыть сейчас\n"
+            "• <code>завтра</code> - завтра в 09:00\n"
+            "• <code>ДД.ММ.ГГГГ</code> - конкретная дата в 09:00\n"
+            "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> - конкретная дата и время\n"
+            "• <code>неделя</code> - через неделю в 09:00\n\n"
+            "💡 <i>Для отмены введите</i> <code>/cancel</code>"
         )
         
         keyboard = [
@@ -2996,7 +3201,7 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
@@ -3005,94 +3210,77 @@ class AdminBot:
 
     async def handle_edit_open_date(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод новой даты открытия задания"""
-        if not await self._check_admin_access(update):
-            return
-        
         open_date_input = update.message.text.strip().lower()
         task_id = context.user_data.get('editing_task_id')
         
         if not task_id:
             await update.message.reply_text("❌ Ошибка: ID задания не найден.")
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             return
         
+        now = datetime.now(MOSCOW_TZ)
         try:
             # Обработка различных вариантов ввода
-            if open_date_input in ['сейчас', 'now']:
-                new_open_date = datetime.now(self.moscow_tz)
-            elif open_date_input in ['завтра', 'tomorrow']:
-                new_open_date = datetime.now(self.moscow_tz) + timedelta(days=1)
-                new_open_date = new_open_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            elif open_date_input in ['неделя', 'week']:
-                new_open_date = datetime.now(self.moscow_tz) + timedelta(weeks=1)
-                new_open_date = new_open_date.replace(hour=9, minute=0, second=0, microsecond=0)
+            keyword = _OPEN_DATE_KEYWORDS.get(open_date_input)
+            if keyword is not None:
+                new_open_date = keyword(now)
             else:
                 # Попытка парсинга ручного ввода
-                try:
-                    if ' ' in open_date_input:
-                        # Формат с временем
-                        new_open_date = datetime.strptime(open_date_input, '%d.%m.%Y %H:%M')
-                    else:
-                        # Только дата, время по умолчанию 09:00
-                        new_open_date = datetime.strptime(open_date_input, '%d.%m.%Y')
-                        new_open_date = new_open_date.replace(hour=9, minute=0)
-                    
-                    new_open_date = self.moscow_tz.localize(new_open_date)
-                except ValueError:
-                    raise ValueError("Неверный формат даты")
+                # Если время не указано, ставим 09:00
+                new_open_date = _parse_date_input(open_date_input, 9, 0)
                 
                 # Проверка, что дата открытия не в прошлом (с учетом текущего времени)
-                if new_open_date < datetime.now(self.moscow_tz):
+                if new_open_date < now:
                     await update.message.reply_text(
-                        "❌ **Дата открытия в прошлом**\n\n"
+                        "❌ <b>Дата открытия в прошлом</b>\n\n"
                         "Дата открытия должна быть в будущем или сейчас.\n"
-                        "Попробуйте еще раз:"
+                        "Попробуйте еще раз:",
+                        parse_mode='HTML'
                     )
                     return
                     
         except ValueError as e:
             await update.message.reply_text(
-                "❌ **Неверный формат даты**\n\n"
+                "❌ <b>Неверный формат даты</b>\n\n"
                 "Используйте один из форматов:\n"
-                "• `ДД.ММ.ГГГГ ЧЧ:ММ` (например: 25.12.2024 09:00)\n"
-                "• `ДД.ММ.ГГГГ` (время установится 09:00)\n"
-                "• `сейчас` - открыть сейчас\n"
-                "• `завтра` - завтра в 09:00\n"
-                "• `неделя` - через неделю в 09:00"
+                "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> (например: 25.12.2024 09:00)\n"
+                "• <code>ДД.ММ.ГГГГ</code> (время установится 09:00)\n"
+                "• <code>сейчас</code> - открыть сейчас\n"
+                "• <code>завтра</code> - завтра в 09:00\n"
+                "• <code>неделя</code> - через неделю в 09:00",
+                parse_mode='HTML'
             )
             return
         
         # Обновляем дату открытия в базе данных
         try:
             # Также обновляем статус is_open в зависимости от новой даты
-            is_open = new_open_date <= datetime.now(self.moscow_tz)
+            is_open = new_open_date <= now
             
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'UPDATE tasks SET open_date = ?, is_open = ? WHERE id = ?', 
-                    (new_open_date.isoformat(), is_open, task_id)
-                )
-                conn.commit()
+            # _write сам сбрасывает кэш меню после коммита
+            await self._write(
+                _SQL_UPDATE_TASK_OPEN_DATE,
+                (new_open_date.isoformat(), is_open, task_id)
+            )
             
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
             status_text = "открыто" if is_open else "ожидает открытия"
             
             await update.message.reply_text(
-                f"✅ **Дата открытия задания успешно изменена!**\n\n"
-                f"📅 **Новая дата открытия:** {new_open_date.strftime('%d.%m.%Y в %H:%M МСК')}\n"
-                f"📊 **Статус задания:** {status_text}",
-                parse_mode='Markdown',
+                f"✅ <b>Дата открытия задания успешно изменена!</b>\n\n"
+                f"📅 <b>Новая дата открытия:</b> {_fmt_long(new_open_date)}\n"
+                f"📊 <b>Статус задания:</b> {status_text}",
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
             # Очищаем данные
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             
         except Exception as e:
             logger.error(f"Ошибка при изменении даты открытия задания: {e}")
@@ -3106,17 +3294,14 @@ class AdminBot:
         await query.answer()
         
         data = query.data
-        task_id = int(data.split('_')[2])  # edit_deadline_123
+        task_id = int(data.removeprefix('edit_deadline_'))  # edit_deadline_123
         
         # Сохраняем ID задания в контекст
         context.user_data['editing_task_id'] = task_id
         
         # Получаем задание
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT deadline, open_date FROM tasks WHERE id = ?', (task_id,))
-            task = cursor.fetchone()
-            
+        task = await self._fetch_one(_SQL_TASK_DEADLINE, (task_id,))
+        
         if not task:
             await query.edit_message_text("❌ Задание не найдено.")
             return ConversationHandler.END
@@ -3124,7 +3309,7 @@ class AdminBot:
         current_deadline, open_date = task
         if current_deadline:
             deadline_dt = datetime.fromisoformat(current_deadline)
-            current_deadline_str = deadline_dt.strftime('%d.%m.%Y в %H:%M МСК')
+            current_deadline_str = _fmt_long(deadline_dt)
         else:
             current_deadline_str = "не установлен"
         
@@ -3133,25 +3318,25 @@ class AdminBot:
             open_date_dt = datetime.fromisoformat(open_date)
             suggested_deadline = open_date_dt + timedelta(days=7)
             suggested_deadline = suggested_deadline.replace(hour=23, minute=59, second=59)
-            suggested_str = suggested_deadline.strftime('%d.%m.%Y в %H:%M МСК')
+            suggested_str = _fmt_long(suggested_deadline)
         else:
-            suggested_deadline = datetime.now(self.moscow_tz) + timedelta(days=7)
+            suggested_deadline = datetime.now(MOSCOW_TZ) + timedelta(days=7)
             suggested_deadline = suggested_deadline.replace(hour=23, minute=59, second=59)
-            suggested_str = suggested_deadline.strftime('%d.%m.%Y в %H:%M МСК')
+            suggested_str = _fmt_long(suggested_deadline)
         
         text = (
-            f"✏️ **Редактирование дедлайна задания #{task_id}**\n\n"
-            f"⏰ **Текущий дедлайн:** {current_deadline_str}\n"
-            f"💡 **Предлагаемый дедлайн:** {suggested_str}\n\n"
+            f"✏️ <b>Редактирование дедлайна задания #{task_id}</b>\n\n"
+            f"⏰ <b>Текущий дедлайн:</b> {current_deadline_str}\n"
+            f"💡 <b>Предлагаемый дедлайн:</b> {suggested_str}\n\n"
             "Введите новый дедлайн задания:\n\n"
-            "📋 **Варианты ввода:**\n"
-            "• `авто` - автоматический расчет (через неделю)\n"
-            "• `завтра` - завтра в 23:59\n"
-            "• `ДД.ММ.ГГГГ` - конкретная дата в 23:59\n"
-            "• `ДД.ММ.ГГГГ ЧЧ:ММ` - конкретная дата и время\n"
-            "• `неделя` - через неделю в 23:59\n"
-            "• `нет` - убрать дедлайн\n\n"
-            "💡 _Для отмены введите_ `/cancel`"
+            "📋 <b>Варианты ввода:</b>\n"
+            "• <code>авто</code> - автоматический расчет (через неделю)\n"
+            "• <code>завтра</code> - завтра в 23:59\n"
+            "• <code>ДД.ММ.ГГГГ</code> - конкретная дата в 23:59\n"
+            "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> - конкретная дата и время\n"
+            "• <code>неделя</code> - через неделю в 23:59\n"
+            "• <code>нет</code> - убрать дедлайн\n\n"
+            "💡 <i>Для отмены введите</i> <code>/cancel</code>"
         )
         
         keyboard = [
@@ -3160,7 +3345,7 @@ class AdminBot:
         
         await query.edit_message_text(
             text,
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         
@@ -3169,24 +3354,19 @@ class AdminBot:
 
     async def handle_edit_deadline(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает ввод нового дедлайна задания"""
-        if not await self._check_admin_access(update):
-            return
-        
         deadline_input = update.message.text.strip().lower()
         task_id = context.user_data.get('editing_task_id')
         
         if not task_id:
             await update.message.reply_text("❌ Ошибка: ID задания не найден.")
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             return
         
         # Получаем дату открытия для валидации
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT open_date FROM tasks WHERE id = ?', (task_id,))
-            result = cursor.fetchone()
-            open_date = result[0] if result else None
+        task = await self._fetch_one(_SQL_TASK_OPEN_DATE, (task_id,))
+        open_date = task[0] if task else None
         
+        now = datetime.now(MOSCOW_TZ)
         try:
             # Обработка различных вариантов ввода дедлайна
             if deadline_input in ['авто', 'auto']:
@@ -3195,34 +3375,22 @@ class AdminBot:
                     open_date_dt = datetime.fromisoformat(open_date)
                     new_deadline = open_date_dt + timedelta(days=7)
                 else:
-                    new_deadline = datetime.now(self.moscow_tz) + timedelta(days=7)
-                new_deadline = new_deadline.replace(hour=23, minute=59, second=59)
-            elif deadline_input in ['завтра', 'tomorrow']:
-                new_deadline = datetime.now(self.moscow_tz).replace(hour=23, minute=59, second=59) + timedelta(days=1)
-            elif deadline_input in ['неделя', 'week']:
-                new_deadline = datetime.now(self.moscow_tz) + timedelta(weeks=1)
+                    new_deadline = now + timedelta(days=7)
                 new_deadline = new_deadline.replace(hour=23, minute=59, second=59)
-            elif deadline_input in ['нет', 'no', '-']:
-                new_deadline = None
+            elif deadline_input in _DEADLINE_KEYWORDS:
+                new_deadline = _DEADLINE_KEYWORDS[deadline_input](now)
             else:
                 # Попытка парсинга ручного ввода
-                try:
-                    if ' ' in deadline_input:
-                        new_deadline = datetime.strptime(deadline_input, '%d.%m.%Y %H:%M')
-                    else:
-                        new_deadline = datetime.strptime(deadline_input, '%d.%m.%Y')
-                        new_deadline = new_deadline.replace(hour=23, minute=59)
-                    
-                    new_deadline = self.moscow_tz.localize(new_deadline)
-                except ValueError:
-                    raise ValueError("Неверный формат даты")
+                # Если время не указано, ставим 23:59
+                new_deadline = _parse_date_input(deadline_input, 23, 59)
                 
                 # Проверка, что дедлайн в будущем
-                if new_deadline and new_deadline <= datetime.now(self.moscow_tz):
+                if new_deadline and new_deadline <= now:
                     await update.message.reply_text(
-                        "❌ **Дедлайн в прошлом**\n\n"
+                        "❌ <b>Дедлайн в прошлом</b>\n\n"
                         "Дедлайн должен быть в будущем.\n"
-                        "Попробуйте еще раз:"
+                        "Попробуйте еще раз:",
+                        parse_mode='HTML'
                     )
                     return
                 
@@ -3231,52 +3399,51 @@ class AdminBot:
                     open_date_dt = datetime.fromisoformat(open_date)
                     if new_deadline <= open_date_dt:
                         await update.message.reply_text(
-                            "❌ **Дедлайн раньше даты открытия**\n\n"
+                            "❌ <b>Дедлайн раньше даты открытия</b>\n\n"
                             "Дедлайн должен быть позже даты открытия задания.\n"
-                            "Попробуйте еще раз:"
+                            "Попробуйте еще раз:",
+                            parse_mode='HTML'
                         )
                         return
                     
         except ValueError as e:
             await update.message.reply_text(
-                "❌ **Неверный формат даты**\n\n"
+                "❌ <b>Неверный формат даты</b>\n\n"
                 "Используйте один из форматов:\n"
-                "• `ДД.ММ.ГГГГ ЧЧ:ММ` (например: 25.12.2024 23:59)\n"
-                "• `ДД.ММ.ГГГГ` (время установится 23:59)\n"
-                "• `авто` - автоматический расчет\n"
-                "• `завтра` - завтра в 23:59\n"
-                "• `неделя` - через неделю\n"
-                "• `нет` - без дедлайна"
+                "• <code>ДД.ММ.ГГГГ ЧЧ:ММ</code> (например: 25.12.2024 23:59)\n"
+                "• <code>ДД.ММ.ГГГГ</code> (время установится 23:59)\n"
+                "• <code>авто</code> - автоматический расчет\n"
+                "• <code>завтра</code> - завтра в 23:59\n"
+                "• <code>неделя</code> - через неделю\n"
+                "• <code>нет</code> - без дедлайна",
+                parse_mode='HTML'
             )
             return
         
         # Обновляем дедлайн в базе данных
         try:
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'UPDATE tasks SET deadline = ? WHERE id = ?', 
-                    (new_deadline.isoformat() if new_deadline else None, task_id)
-                )
-                conn.commit()
+            await self._write(
+                _SQL_UPDATE_TASK_DEADLINE,
+                (new_deadline.isoformat() if new_deadline else None, task_id)
+            )
             
             keyboard = [
                 [InlineKeyboardButton("📋 Вернуться к заданию", callback_data=f"task_{task_id}")],
                 [InlineKeyboardButton("📝 Список заданий", callback_data="list_tasks")],
-                [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+                [_BTN_MAIN_MENU]
             ]
             
-            deadline_text = new_deadline.strftime('%d.%m.%Y в %H:%M МСК') if new_deadline else "не установлен"
+            deadline_text = _fmt_long(new_deadline) if new_deadline else "не установлен"
             
             await update.message.reply_text(
-                f"✅ **Дедлайн задания успешно изменен!**\n\n"
-                f"⏰ **Новый дедлайн:** {deadline_text}",
-                parse_mode='Markdown',
+                f"✅ <b>Дедлайн задания успешно изменен!</b>\n\n"
+                f"⏰ <b>Новый дедлайн:</b> {deadline_text}",
+                parse_mode='HTML',
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
             
             # Очищаем данные
-            context.user_data.clear()
+            self._clear_dialog_state(context)
             
         except Exception as e:
             logger.error(f"Ошибка при изменении дедлайна задания: {e}")
@@ -3284,11 +3451,9 @@ class AdminBot:
                 f"❌ Ошибка при изменении дедлайна: {str(e)}"
             )
 
+    @_requires_admin
     async def handle_edit_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает сообщения во время редактирования заданий"""
-        if not await self._check_admin_access(update):
-            return
-        
         # Проверяем, есть ли активное состояние редактирования
         editing_state = context.user_data.get('editing_state')
         
@@ -3304,40 +3469,31 @@ class AdminBot:
             await self.handle_edit_deadline(update, context)
         # Если состояние не найдено, игнорируем сообщение
 
+    @_requires_admin
     async def cancel_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Отменяет текущий диалог"""
-        if not await self._check_admin_access(update):
-            return ConversationHandler.END
-            
         # Очищаем данные
-        context.user_data.clear()
+        self._clear_dialog_state(context)
         
         keyboard = [
             [InlineKeyboardButton("📋 Задания", callback_data="tasks_menu")],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+            [_BTN_MAIN_MENU]
         ]
         
         await update.message.reply_text(
-            "❌ **Операция отменена**\n\n"
+            "❌ <b>Операция отменена</b>\n\n"
             "Выберите действие:",
-            parse_mode='Markdown',
+            parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         return ConversationHandler.END
 
-# Расширяем класс Database методом для получения соединения
-def add_connection_method():
-    def _get_connection(self):
-        import sqlite3
-        return sqlite3.connect(self.db_path)
-    
-    Database._get_connection = _get_connection
-
-# Применяем расширение
-add_connection_method()
-
 def main():
     """Основная функция запуска админ-бота"""
+    # Загружаем переменные окружения только при запуске бота, а не при импорте
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     # Проверяем токен
     token = os.getenv('ADMIN_BOT_TOKEN')
     if not token:
@@ -3370,7 +3526,17 @@ def main():
             return
     
     # Создаем приложение
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    try:
+        builder = builder.rate_limiter(AIORateLimiter(
+            overall_max_rate=SEND_OVERALL_RATE,
+            group_max_rate=SEND_GROUP_RATE_PER_MINUTE,
+            max_retries=SEND_MAX_RETRIES,
+        ))
+    except RuntimeError:
+        # Нет aiolimiter: pip install "python-telegram-bot[rate-limiter]"
+        logger.warning("aiolimiter не установлен, исходящие сообщения не ограничиваются")
+    application = builder.build()
     
     # Создаем экземпляр бота
     admin_bot = AdminBot()
@@ -3378,18 +3544,34 @@ def main():
     # ConversationHandler для добавления заданий
     add_task_handler = ConversationHandler(
         entry_points=[
-            CallbackQueryHandler(admin_bot._start_add_task_conversation, pattern="^create_manual$")
+            CallbackQueryHandler(admin_bot._start_add_task_conversation, pattern="^create_manual$"),
+            # Кнопки правки предпросмотра возвращают админа в нужный шаг диалога
+            CallbackQueryHandler(admin_bot.handle_callback, pattern=_PREVIEW_EDIT_PATTERN),
         ],
         states={
-            ADDING_TASK_TITLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_title)],
+            ADDING_TASK_TITLE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_title),
+                # Шаблоны из подсказки шага 1: /template_observation и т.д.
+                MessageHandler(filters.Regex(r'^/template_\w+$'), admin_bot.handle_add_task_title),
+            ],
             ADDING_TASK_DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_description)],
             ADDING_TASK_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_link)],
             ADDING_TASK_OPEN_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_open_date)],
             ADDING_TASK_DEADLINE: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_bot.handle_add_task_deadline)],
         },
-        fallbacks=[CommandHandler("cancel", admin_bot.cancel_conversation)],
+        fallbacks=[
+            CommandHandler("cancel", admin_bot.cancel_conversation),
+            # Переход по меню или к другому диалогу завершает создание задания
+            CallbackQueryHandler(admin_bot._leave_add_task_conversation, pattern=r"^(?!create_manual$|edit_preview_(title|description|link|open_date|deadline)$)"),
+        ],
+        conversation_timeout=ADD_TASK_CONVERSATION_TIMEOUT,
         name="add_task",
-        per_message=True
+        # Состояние диалога хранится на пару (чат, админ): текстовые шаги после
+        # кнопки create_manual доходят до обработчиков состояний
+        per_chat=True,
+        per_user=True,
+        per_message=False,
+        allow_reentry=True
     )
     
     # Обработчик сообщений для редактирования заданий
@@ -3406,10 +3588,7 @@ def main():
     
     # Устанавливаем команды бота
     async def set_commands(app):
-        commands = [
-            BotCommand("start", "Запустить админ-панель")
-        ]
-        await app.bot.set_my_commands(commands)
+        await app.bot.set_my_commands(_BOT_COMMANDS)
     
     application.post_init = set_commands
     
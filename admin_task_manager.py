@@ -9,7 +9,7 @@ import json
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-import pytz
+from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ class TaskManager:
     
     def __init__(self, db):
         self.db = db
-        self.moscow_tz = pytz.timezone('Europe/Moscow')
+        self.moscow_tz = ZoneInfo('Europe/Moscow')
     
     def create_task_from_template(self, template_name: str, week_number: int = None, 
                                 custom_params: Dict[str, Any] = None) -> dict:
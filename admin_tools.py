@@ -5,14 +5,14 @@
 import argparse
 import sqlite3
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
 from database import Database
 
 def add_task(args):
     """Добавляет новое задание"""
     db = Database()
     
-    moscow_tz = pytz.timezone('Europe/Moscow')
+    moscow_tz = ZoneInfo('Europe/Moscow')
     
     # Если указан номер недели, вычисляем дедлайн
     deadline = None
@@ -158,6 +158,16 @@ def close_task(args):
         else:
             print(f"❌ Задание {args.task_id} не найдено")
 
+def enable_auto_vacuum(args):
+    """Включает инкрементальный auto_vacuum (полный VACUUM базы)"""
+    db = Database()
+    
+    print("⏳ Перестройка базы данных, боты на это время лучше остановить...")
+    if db.enable_incremental_vacuum():
+        print("✅ Инкрементальный auto_vacuum включен")
+    else:
+        print("ℹ️ Инкрементальный auto_vacuum уже включен")
+
 def main():
     parser = argparse.ArgumentParser(description='Инструменты администратора Эко-бота')
     subparsers = parser.add_subparsers(dest='command', help='Доступные команды')
@@ -193,6 +203,10 @@ def main():
     close_parser.add_argument('task_id', type=int, help='ID задания')
     close_parser.set_defaults(func=close_task)
     
+    # Включить инкрементальный auto_vacuum
+    vacuum_parser = subparsers.add_parser('enable-auto-vacuum', help='Перестроить БД для инкрементальной очистки')
+    vacuum_parser.set_defaults(func=enable_auto_vacuum)
+    
     args = parser.parse_args()
     
     if hasattr(args, 'func'):
@@ -5,7 +5,7 @@ import asyncio
 import sqlite3
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pytz
+from zoneinfo import ZoneInfo
 from typing import Optional
 from telegram import Update, Document, PhotoSize, Video, InlineKeyboardMarkup, InlineKeyboardButton, BotCommand
 from telegram.ext import (
@@ -117,7 +117,7 @@ class EcoBot:
     def __init__(self):
         self.db = Database()
         self.keyboards = Keyboards()
-        self.moscow_tz = pytz.timezone('Europe/Moscow')
+        self.moscow_tz = ZoneInfo('Europe/Moscow')
         
         # Создаем папку для файлов
         self.files_dir = "uploaded_files"
@@ -182,11 +182,10 @@ class EcoBot:
 
     def _should_show_july_21_message(self):
         """Проверяет, нужно ли показывать сообщение о первом задании 21 июля"""
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        now = datetime.now(moscow_tz)
+        now = datetime.now(self.moscow_tz)
         
         # Дата и время когда сообщение должно перестать показываться: 21 июля 2025 в 00:00 МСК
-        cutoff_date = moscow_tz.localize(datetime(2025, 7, 21, 0, 0, 0))
+        cutoff_date = datetime(2025, 7, 21, 0, 0, 0, tzinfo=self.moscow_tz)
         
         return now < cutoff_date
     
@@ -1,22 +1,139 @@
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import List, Tuple, Optional, Dict, Any
-import pytz
+from zoneinfo import ZoneInfo
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Часовой пояс для дат заданий и отчетов
+MOSCOW_TZ = ZoneInfo('Europe/Moscow')
+
+# Сколько соединений только для чтения держим открытыми одновременно
+READ_POOL_SIZE = 4
+# Размер кэша подготовленных выражений на долгоживущем соединении: все запросы
+# админ-бота (с вариантами страниц) помещаются в него без вытеснения
+STATEMENT_CACHE_SIZE = 256
+# Кэш страниц каждого долгоживущего соединения в КиБ (отрицательное значение PRAGMA)
+PAGE_CACHE_KIB = 64000
+
+
+def sql_date_short(column: str) -> str:
+    """SQL-выражение даты колонки в виде ДД.ММ ЧЧ:ММ.
+    
+    Дата режется по позициям, без пересчета часового пояса, поэтому
+    одинаково подходит для CURRENT_TIMESTAMP и для isoformat() со смещением.
+    """
+    return f"substr({column}, 9, 2) || '.' || substr({column}, 6, 2) || ' ' || substr({column}, 12, 5)"
+
+
+def sql_date_long(column: str) -> str:
+    """SQL-выражение даты колонки в виде ДД.ММ.ГГГГ в ЧЧ:ММ МСК"""
+    return (
+        f"substr({column}, 9, 2) || '.' || substr({column}, 6, 2) || '.' || substr({column}, 1, 4)"
+        f" || ' в ' || substr({column}, 12, 5) || ' МСК'"
+    )
+
+
 class Database:
     def __init__(self, db_path: str = "eco_bot.db"):
         self.db_path = db_path
+        self._shared_conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.RLock()
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=READ_POOL_SIZE)
+        self._read_opened = 0
         self.init_database()
     
+    def _open_persistent(self, readonly: bool = False) -> sqlite3.Connection:
+        """Открывает долгоживущее соединение для повторного использования.
+        
+        Соединение можно использовать из разных потоков, поэтому доступ к нему
+        должен сериализоваться вызывающей стороной.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{PAGE_CACHE_KIB}')
+        # Временные таблицы сортировок в памяти, файл БД читается через mmap
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        if readonly:
+            conn.execute('PRAGMA query_only=ON')
+        # Строки доступны и по индексу, и по имени колонки
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает короткоживущее соединение для разовых запросов.
+        
+        Режим WAL хранится в самом файле БД, а synchronous действует только
+        на текущее соединение, поэтому задается при каждом открытии.
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    @contextmanager
+    def _get_connection(self):
+        """Выдает общее долгоживущее соединение под блокировкой.
+        
+        Соединение открывается при первом обращении. Транзакция фиксируется
+        при выходе из блока with и откатывается при исключении.
+        """
+        with self._conn_lock:
+            if self._shared_conn is None:
+                self._shared_conn = self._open_persistent()
+            with self._shared_conn:
+                yield self._shared_conn
+    
+    @contextmanager
+    def _get_read_connection(self):
+        """Выдает соединение только для чтения из пула.
+        
+        В режиме WAL читатели не ждут писателя и друг друга, поэтому запросы
+        из разных потоков выполняются параллельно. Соединения открываются по
+        мере надобности, но не больше READ_POOL_SIZE.
+        """
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            with self._conn_lock:
+                grow = self._read_opened < READ_POOL_SIZE
+                if grow:
+                    self._read_opened += 1
+            conn = self._open_persistent(readonly=True) if grow else self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._read_pool.put(conn)
+    
     def init_database(self):
         """Инициализация базы данных с необходимыми таблицами"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
+            # Инкрементальный auto_vacuum: очистка освобождает страницы порциями,
+            # без полного VACUUM. В новой базе режим включается до создания таблиц,
+            # существующую перестраивает команда admin_tools.py enable-auto-vacuum
+            if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                if cursor.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0] == 0:
+                    cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                else:
+                    logger.warning("Инкрементальный auto_vacuum выключен: для его включения "
+                                   "выполните python admin_tools.py enable-auto-vacuum")
+            
+            # WAL сохраняется в файле: читатели не ждут писателя с первого запуска
+            # любого из ботов, а не только после подключения админ-бота
+            cursor.execute('PRAGMA journal_mode=WAL')
+            
             # Таблица пользователей с расширенной информацией
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -94,6 +211,51 @@ class Database:
                 cursor.execute('ALTER TABLE tasks ADD COLUMN open_date TIMESTAMP')
                 logger.info("Добавлено поле open_date в таблицу tasks")
             
+            # Миграция: счетчик отчетов по заданию (дальше поддерживается триггерами)
+            try:
+                cursor.execute('SELECT submissions_count FROM tasks LIMIT 1')
+            except sqlite3.OperationalError:
+                cursor.execute('ALTER TABLE tasks ADD COLUMN submissions_count INTEGER NOT NULL DEFAULT 0')
+                cursor.execute('''
+                    UPDATE tasks SET submissions_count =
+                        (SELECT COUNT(*) FROM submissions WHERE task_id = tasks.id)
+                ''')
+                logger.info("Добавлено поле submissions_count в таблицу tasks")
+            
+            # Триггеры, поддерживающие tasks.submissions_count
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_submissions_count_insert
+                AFTER INSERT ON submissions
+                BEGIN
+                    UPDATE tasks SET submissions_count = submissions_count + 1 WHERE id = NEW.task_id;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_submissions_count_delete
+                AFTER DELETE ON submissions
+                BEGIN
+                    UPDATE tasks SET submissions_count = submissions_count - 1 WHERE id = OLD.task_id;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_submissions_count_move
+                AFTER UPDATE OF task_id ON submissions
+                WHEN OLD.task_id IS NOT NEW.task_id
+                BEGIN
+                    UPDATE tasks SET submissions_count = submissions_count - 1 WHERE id = OLD.task_id;
+                    UPDATE tasks SET submissions_count = submissions_count + 1 WHERE id = NEW.task_id;
+                END
+            ''')
+            
+            # Каскадное удаление отчетов вместе с заданием (foreign_keys не включены)
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_submissions
+                BEFORE DELETE ON tasks
+                BEGIN
+                    DELETE FROM submissions WHERE task_id = OLD.id;
+                END
+            ''')
+            
             # Таблица обращений в поддержку
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS support_requests (
@@ -119,8 +281,77 @@ class Database:
                 )
             ''')
             
+            # Набор индексов до миграции: полный ANALYZE нужен, только если он изменился
+            index_sql = "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+            indexes_before = cursor.execute(index_sql).fetchall()
+            
+            # Индекс для проверки уникальности названий заданий
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_title ON tasks (title)')
+            
+            # Индексы для очереди проверки (status + дата) и отчетов по заданию
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_submissions_status_date
+                ON submissions (status, submission_date)
+            ''')
+            # (task_id, дата) заменяет прежний индекс только по task_id
+            cursor.execute('DROP INDEX IF EXISTS idx_submissions_task')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_submissions_task_date
+                ON submissions (task_id, submission_date)
+            ''')
+            # Лента всех отчетов по дате и покрывающий индекс статистики пользователя
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_submissions_date ON submissions (submission_date)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_submissions_user
+                ON submissions (user_id, status, is_on_time)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_is_open ON tasks (is_open)')
+            
+            # Частичный индекс для подсчета необработанных потенциальных отчетов
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_offline_messages_potential
+                ON offline_messages (message_type, processed)
+                WHERE message_type = 'potential_report'
+            ''')
+            
+            # Индексы под условия очистки логов (_get_log_stats / _perform_log_cleanup)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_offline_messages_processed_date
+                ON offline_messages (processed, received_date)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_states_updated ON user_states (last_updated)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_support_requests_status_date
+                ON support_requests (status, request_date)
+            ''')
+            
+            # Статистику для новых индексов собираем один раз; при обычном запуске
+            # PRAGMA optimize пересчитывает ее только для заметно изменившихся таблиц
+            if cursor.execute(index_sql).fetchall() != indexes_before:
+                cursor.execute('ANALYZE')
+                logger.info("Индексы изменились, статистика планировщика обновлена")
+            else:
+                cursor.execute('PRAGMA optimize')
+            
             conn.commit()
     
+    def enable_incremental_vacuum(self) -> bool:
+        """Переводит существующую базу в режим auto_vacuum=INCREMENTAL.
+        
+        Для этого нужен полный VACUUM: он блокирует базу на время перестройки
+        и временно требует примерно вдвое больше места на диске, поэтому
+        запускается только вручную. Возвращает False, если режим уже включен.
+        """
+        with self._connect() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                return False
+            started = time.monotonic()
+            logger.info(f"Перестройка базы {self.db_path} для auto_vacuum=INCREMENTAL...")
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+            logger.info(f"Инкрементальный auto_vacuum включен за {time.monotonic() - started:.1f} с")
+            return True
+    
     def save_user_state(self, user_id: int, state: int, context_data: Dict[str, Any] = None):
         """Сохраняет текущее состояние пользователя"""
         if context_data is None:
@@ -128,7 +359,7 @@ class Database:
         
         context_json = json.dumps(context_data, ensure_ascii=False)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO user_states (user_id, current_state, context_data, last_updated)
@@ -138,7 +369,7 @@ class Database:
     
     def get_user_state(self, user_id: int) -> Tuple[int, Dict[str, Any]]:
         """Получает состояние пользователя"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT current_state, context_data FROM user_states WHERE user_id = ?
@@ -157,7 +388,7 @@ class Database:
     
     def clear_user_state(self, user_id: int):
         """Очищает состояние пользователя (возвращает в главное меню)"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE user_states SET current_state = 0, context_data = '{}', last_updated = CURRENT_TIMESTAMP
@@ -173,7 +404,7 @@ class Database:
     
     def save_offline_message(self, user_id: int, message_data: str, message_type: str = 'text'):
         """Сохраняет сообщение, полученное в офлайн режиме"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO offline_messages (user_id, message_data, message_type)
@@ -183,7 +414,7 @@ class Database:
     
     def get_offline_messages(self, user_id: int) -> List[Tuple]:
         """Получает необработанные офлайн сообщения для пользователя"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, message_data, message_type, received_date
@@ -195,7 +426,7 @@ class Database:
     
     def mark_offline_message_processed(self, message_id: int):
         """Помечает офлайн сообщение как обработанное"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE offline_messages SET processed = TRUE WHERE id = ?
@@ -204,7 +435,7 @@ class Database:
     
     def add_user(self, user_id: int, username: str = None, telegram_first_name: str = None, telegram_last_name: str = None):
         """Добавляет нового пользователя или обновляет только telegram-данные существующего"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Проверяем, существует ли пользователь
@@ -231,7 +462,7 @@ class Database:
                                participation_type: str, family_members_count: int = 1, 
                                children_info: str = None):
         """Обновляет информацию о регистрации пользователя"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE users 
@@ -243,7 +474,7 @@ class Database:
     
     def update_user_name(self, user_id: int, first_name: str, last_name: str):
         """Обновляет имя и фамилию пользователя"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE users 
@@ -255,14 +486,14 @@ class Database:
     
     def get_user(self, user_id: int) -> Optional[Tuple]:
         """Получает информацию о пользователе"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
             return cursor.fetchone()
     
     def is_user_registered(self, user_id: int) -> bool:
         """Проверяет, завершил ли пользователь регистрацию"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT registration_completed FROM users WHERE user_id = ?', (user_id,))
             result = cursor.fetchone()
@@ -270,13 +501,12 @@ class Database:
     
     def get_current_week_tasks(self) -> List[Tuple]:
         """Возвращает задания текущей недели"""
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        now = datetime.now(moscow_tz)
+        now = datetime.now(MOSCOW_TZ)
         
         # Вычисляем номер недели (для простоты используем номер недели в году)
         week_number = now.isocalendar()[1]
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, title, description, link, deadline FROM tasks 
@@ -286,10 +516,9 @@ class Database:
     
     def get_open_tasks(self) -> List[Tuple]:
         """Возвращает список открытых заданий текущей недели"""
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        now = datetime.now(moscow_tz)
+        now = datetime.now(MOSCOW_TZ)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             # Получаем задания, которые еще не истекли
             cursor.execute('''
@@ -300,16 +529,26 @@ class Database:
     
     def get_all_tasks(self) -> List[Tuple]:
         """Возвращает все задания (открытые и архивные)"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT id, title, description, link, is_open FROM tasks')
             return cursor.fetchall()
     
+    def get_all_tasks_with_counts(self) -> List[Tuple]:
+        """Возвращает все задания (по возрастанию id) вместе с количеством отчетов по каждому"""
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, description, link, is_open, submissions_count FROM tasks
+                ORDER BY id
+            ''')
+            return cursor.fetchall()
+    
     def add_task(self, title: str, description: str = None, link: str = None, 
                  week_number: int = None, deadline: datetime = None, is_open: bool = True, 
-                 open_date: datetime = None):
-        """Добавляет новое задание"""
-        with sqlite3.connect(self.db_path) as conn:
+                 open_date: datetime = None) -> int:
+        """Добавляет новое задание и возвращает его ID"""
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO tasks (title, description, link, week_number, deadline, is_open, open_date)
@@ -318,17 +557,17 @@ class Database:
                   deadline.isoformat() if deadline else None, is_open,
                   open_date.isoformat() if open_date else None))
             conn.commit()
+            return cursor.lastrowid
     
     def submit_task(self, user_id: int, task_id: int, submission_type: str = 'text', 
                    content: str = None, file_id: str = None, file_path: str = None):
         """Записывает отправку задания пользователем"""
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        submission_time = datetime.now(moscow_tz)
+        submission_time = datetime.now(MOSCOW_TZ)
         
         # Проверяем, не опоздал ли пользователь
         is_on_time = self._check_submission_deadline(task_id, submission_time)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO submissions (user_id, task_id, submission_type, content, file_id, file_path, is_on_time)
@@ -340,7 +579,7 @@ class Database:
     
     def _check_submission_deadline(self, task_id: int, submission_time: datetime) -> bool:
         """Проверяет, отправлено ли задание в срок"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT deadline FROM tasks WHERE id = ?', (task_id,))
             result = cursor.fetchone()
@@ -353,7 +592,7 @@ class Database:
     
     def get_user_submissions(self, user_id: int) -> List[Tuple]:
         """Возвращает отправки пользователя с информацией о заданиях"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT t.title, s.submission_date, s.status, s.is_on_time
@@ -366,7 +605,7 @@ class Database:
     
     def get_user_stats(self, user_id: int) -> Tuple[int, int]:
         """Возвращает статистику пользователя: выполнено заданий, всего открытых"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Количество выполненных заданий (только отправленных в срок)
@@ -378,8 +617,7 @@ class Database:
             completed = cursor.fetchone()[0]
             
             # Общее количество открытых заданий текущей недели
-            moscow_tz = pytz.timezone('Europe/Moscow')
-            now = datetime.now(moscow_tz)
+            now = datetime.now(MOSCOW_TZ)
             
             cursor.execute('''
                 SELECT COUNT(*) FROM tasks 
@@ -391,7 +629,7 @@ class Database:
     
     def add_support_request(self, user_id: int, message: str):
         """Добавляет обращение в поддержку"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO support_requests (user_id, message)
@@ -401,10 +639,9 @@ class Database:
     
     def create_weekly_tasks(self, week_number: int):
         """Создает тестовые задания для указанной недели"""
-        moscow_tz = pytz.timezone('Europe/Moscow')
         
         # Понедельник в 11:00 МСК
-        monday_publication = datetime.now(moscow_tz).replace(hour=11, minute=0, second=0, microsecond=0)
+        monday_publication = datetime.now(MOSCOW_TZ).replace(hour=11, minute=0, second=0, microsecond=0)
         
         # Четверг в 11:00 МСК
         thursday_publication = monday_publication + timedelta(days=3)
@@ -434,7 +671,7 @@ class Database:
 
     def get_potential_reports(self, user_id: int = None) -> List[Tuple]:
         """Возвращает потенциальные отчеты для ручной обработки"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             if user_id:
                 cursor.execute('''
@@ -452,9 +689,37 @@ class Database:
                 ''')
             return cursor.fetchall()
 
+    def get_potential_reports_page(self, limit: int) -> Tuple[int, List[sqlite3.Row]]:
+        """Возвращает число необработанных потенциальных отчетов и первые limit из них.
+        
+        Тип сообщения достается из message_data через json_extract, дата
+        приходит уже отформатированной, строки с некорректным JSON не попадают
+        ни в выборку, ни в счетчик.
+        """
+        with self._get_read_connection() as conn:
+            cursor = conn.cursor()
+            # Тот же фильтр json_valid, что и у страницы, чтобы счетчик совпадал со списком
+            cursor.execute('''
+                SELECT COUNT(*) FROM offline_messages
+                WHERE message_type = 'potential_report' AND processed = FALSE
+                  AND json_valid(message_data)
+            ''')
+            total = cursor.fetchone()[0]
+            cursor.execute(f'''
+                SELECT id, user_id,
+                       COALESCE(json_extract(message_data, '$.type'), 'text') AS msg_type,
+                       {sql_date_long('received_date')} AS received_label
+                FROM offline_messages
+                WHERE message_type = 'potential_report' AND processed = FALSE
+                  AND json_valid(message_data)
+                ORDER BY received_date DESC
+                LIMIT ?
+            ''', (limit,))
+            return total, cursor.fetchall()
+
     def mark_potential_report_as_submission(self, message_id: int, task_id: int, admin_notes: str = None):
         """Превращает потенциальный отчет в официальный отчет"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Получаем данные сообщения
@@ -476,8 +741,7 @@ class Database:
                 file_path = data.get('file_path')
                 
                 # Создаем официальный отчет
-                moscow_tz = pytz.timezone('Europe/Moscow')
-                submission_time = datetime.now(moscow_tz)
+                submission_time = datetime.now(MOSCOW_TZ)
                 is_on_time = self._check_submission_deadline(task_id, submission_time)
                 
                 cursor.execute('''
@@ -506,7 +770,7 @@ class Database:
 
     def get_all_potential_reports_summary(self) -> Dict[str, int]:
         """Возвращает сводку по потенциальным отчетам"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Общее количество
@@ -541,7 +805,7 @@ class Database:
 
     def get_task_by_id(self, task_id: int) -> Optional[tuple]:
         """Возвращает полную информацию о задании по его id"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, title, description, link, is_open, week_number, deadline, open_date